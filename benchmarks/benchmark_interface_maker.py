@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the duplicate trimming in interface_maker
+Compares the pairwise np.allclose trim against the sorted trim across max_area values
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+# Setup paths
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR / "src"))
+
+from masgent.utils.interface_maker import find_ijm, reduce, uv_params, trim
+
+
+def trim_pairwise(data):
+    """Original O(n^2) trim, kept here as the reference"""
+    data = np.array(data)
+    lattice_params = data[:, -3:]
+
+    same_idx = []
+    for i in range(len(lattice_params)):
+        for j in range(i + 1, len(lattice_params)):
+            if np.allclose(lattice_params[i], lattice_params[j]):
+                same_idx.append(j)
+
+    data = np.delete(data, same_idx, axis=0)
+    return data.tolist(), same_idx
+
+
+def supercell_candidates(ab, n):
+    """Untrimmed cal_uv rows for scaling factor n of the 2D cell ab"""
+    ijm = np.array(find_ijm(n))
+    ijm_matrix = np.zeros((len(ijm), 2, 2), dtype=int)
+    ijm_matrix[:, 0, 0], ijm_matrix[:, 0, 1], ijm_matrix[:, 1, 1] = ijm[:, 0], ijm[:, 1], ijm[:, 2]
+    supercell = ijm_matrix @ ab
+    u_r, v_r, T_r = reduce(supercell[:, 0], supercell[:, 1])
+    return np.column_stack([T_r.reshape(-1, 4), *uv_params(u_r, v_r)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark interface_maker.trim")
+    parser.add_argument("--max-areas", type=float, nargs="+", default=[100, 200, 400, 800])
+    parser.add_argument("--a", type=float, default=2.55, help="2D hexagonal lattice constant in Angstroms")
+    args = parser.parse_args()
+
+    ab = np.array([[args.a, 0.0], [args.a / 2, args.a * np.sqrt(3) / 2]])
+    area = abs(np.linalg.det(ab))
+
+    print("=" * 70)
+    print("MASGENT - INTERFACE MAKER TRIM BENCHMARK")
+    print("=" * 70)
+    print(f"{'Max area (A^2)':<16}{'Rows':<10}{'Pairwise (s)':<16}{'Sorted (s)':<16}{'Speedup':<10}")
+
+    for max_area in args.max_areas:
+        data_list = [supercell_candidates(ab, n) for n in range(1, int(max_area / area) + 1)]
+        rows = sum(len(data) for data in data_list)
+
+        start = time.perf_counter()
+        old = [trim_pairwise(data)[0] for data in data_list]
+        t_old = time.perf_counter() - start
+
+        start = time.perf_counter()
+        new = [trim(data)[0] for data in data_list]
+        t_new = time.perf_counter() - start
+
+        if not all(np.array_equal(o, n) for o, n in zip(old, new)):
+            print(f"❌ Survivor sets differ for max_area = {max_area}")
+            sys.exit(1)
+
+        print(f"{max_area:<16.1f}{rows:<10}{t_old:<16.4f}{t_new:<16.4f}{t_old / t_new:<10.1f}")
+
+    print("✅ Same survivor sets for all max_area values")
+
+
+if __name__ == "__main__":
+    main()
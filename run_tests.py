@@ -244,6 +244,148 @@ except Exception as e:
 
 print()
 
+# Test 9: Interface Maker Regression
+print("🧩 Test 9: Interface Maker Regression")
+print("-" * 70)
+
+try:
+    import json
+    import numpy as np
+    from masgent.utils.interface_maker import pair_slabs, lattice_match, find_int, trim
+
+    # Outputs recorded with the original scalar implementation of interface_maker
+    baseline = json.loads((PROJECT_DIR / "tests" / "data" / "interface_maker_baseline.json").read_text())
+
+    def same_rows(rows, expected):
+        return len(rows) == len(expected) and all(
+            list(row[:2]) == list(ref[:2]) and np.allclose(np.array(row[2:], dtype=float), np.array(ref[2:], dtype=float))
+            for row, ref in zip(rows, expected)
+        )
+
+    # lattice_match, including the reduced transform matrices T of both slabs
+    mismatched = []
+    for case in baseline["lattice_match"]:
+        pairs = pair_slabs([case["lower"]], [case["upper"]], case["max_area"])
+        if not same_rows(lattice_match(pairs, [case["lower"]], [case["upper"]]), case["matches"]):
+            mismatched.append(case["name"])
+    if mismatched:
+        raise AssertionError(f"lattice_match differs from baseline for {len(mismatched)} cases, e.g. {mismatched[0]}")
+    print(f"✅ lattice_match matches baseline in {len(baseline['lattice_match'])} cases")
+    test_results.append(("Interface Maker: lattice_match", True, None))
+except Exception as e:
+    print(f"❌ Interface maker regression failed: {e}")
+    test_results.append(("Interface Maker: lattice_match", False, str(e)))
+
+try:
+    # find_int, the integer ratios n_0 / n_1 tried for each pair of slab areas
+    for case in baseline["find_int"]:
+        int_list, ratio = find_int(case["area_0"], case["area_1"], case["area"])
+        if not (same_rows([[a, b, c] for a, b, c in int_list], case["int_list"]) and np.isclose(ratio, case["ratio"])):
+            raise AssertionError(f"find_int differs from baseline for areas {case['area_0']}, {case['area_1']} up to {case['area']}")
+    print(f"✅ find_int matches baseline in {len(baseline['find_int'])} cases")
+    test_results.append(("Interface Maker: find_int", True, None))
+except Exception as e:
+    print(f"❌ find_int regression failed: {e}")
+    test_results.append(("Interface Maker: find_int", False, str(e)))
+
+try:
+    # trim, the duplicate supercells removed for each scaling factor
+    # The baseline lists a duplicate once for every earlier row it matches, only the set of indices matters
+    for case in baseline["trim"]:
+        data, same_idx = trim(case["rows"])
+        expected = np.delete(np.array(case["rows"]), case["same_idx"], axis=0)
+        if set(same_idx) != set(case["same_idx"]) or not np.array_equal(np.array(data), expected):
+            raise AssertionError(f"trim differs from baseline for {case['name']}")
+    print(f"✅ trim matches baseline in {len(baseline['trim'])} cases")
+    test_results.append(("Interface Maker: trim", True, None))
+except Exception as e:
+    print(f"❌ trim regression failed: {e}")
+    test_results.append(("Interface Maker: trim", False, str(e)))
+
+try:
+    # top_k, the k best baseline matches ranked by area, then the larger u / v misfit, then the angle misfit
+    for case in baseline["top_k"]:
+        pairs = pair_slabs([case["lower"]], [case["upper"]], case["max_area"])
+        if not same_rows(lattice_match(pairs, [case["lower"]], [case["upper"]], top_k=case["top_k"]), case["matches"]):
+            raise AssertionError(f"top_k matches differ from baseline for {case['name']}")
+    print(f"✅ top_k matches baseline in {len(baseline['top_k'])} cases")
+    test_results.append(("Interface Maker: top_k", True, None))
+except Exception as e:
+    print(f"❌ top_k regression failed: {e}")
+    test_results.append(("Interface Maker: top_k", False, str(e)))
+
+print()
+
+# Test 10: MD Checkpoint Resume
+print("🔁 Test 10: MD Checkpoint Resume")
+print("-" * 70)
+
+try:
+    import shutil
+    import tempfile
+    import numpy as np
+    import pandas as pd
+    from ase.build import bulk
+    from ase.calculators.emt import EMT
+    from ase.io import read
+    from masgent.utils.mlps import run_md
+
+    class InterruptedEMT(EMT):
+        """EMT calculator that stops the run after n_calls force evaluations"""
+        def __init__(self, n_calls):
+            super().__init__()
+            self.n_calls = n_calls
+
+        def calculate(self, *args, **kwargs):
+            self.n_calls -= 1
+            if self.n_calls < 0:
+                raise KeyboardInterrupt
+            super().calculate(*args, **kwargs)
+
+    def md_run(task_dir, calc, resume):
+        atoms = bulk("Cu", "fcc", a=3.6, cubic=True).repeat((2, 2, 2))
+        return run_md(atoms=atoms, calc=calc, task_dir=task_dir, mlps_type="EMT", temperature=300, md_steps=60,
+                      md_timestep=1.0, loginterval=5, checkpoint_interval=20, resume=resume)
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        ref_dir, resumed_dir = os.path.join(tmp_dir, "ref"), os.path.join(tmp_dir, "resumed")
+        os.makedirs(ref_dir)
+        os.makedirs(resumed_dir)
+        np.random.seed(0)
+        md_run(ref_dir, EMT(), False)
+
+        # Interrupted after the step 40 checkpoint with the step 45 frame already written, then resumed
+        np.random.seed(0)
+        try:
+            md_run(resumed_dir, InterruptedEMT(47), False)
+            raise AssertionError("the MD run was not interrupted")
+        except KeyboardInterrupt:
+            pass
+        result = md_run(resumed_dir, EMT(), True)
+        if result["resumed_from_step"] != 40:
+            raise AssertionError(f"resumed from step {result['resumed_from_step']} instead of 40")
+
+        steps = pd.read_csv(os.path.join(resumed_dir, "md_observables.csv"))["Step"].tolist()
+        ref_steps = pd.read_csv(os.path.join(ref_dir, "md_observables.csv"))["Step"].tolist()
+        if steps != ref_steps:
+            raise AssertionError(f"observable steps {steps} differ from an uninterrupted run {ref_steps}")
+        frames = read(os.path.join(resumed_dir, "masgent_mlps_md.traj"), ":")
+        ref_frames = read(os.path.join(ref_dir, "masgent_mlps_md.traj"), ":")
+        if len(frames) != len(ref_frames):
+            raise AssertionError(f"{len(frames)} trajectory frames instead of {len(ref_frames)}")
+        if not np.allclose(frames[-1].positions, ref_frames[-1].positions):
+            raise AssertionError("final frame differs from an uninterrupted run")
+    finally:
+        shutil.rmtree(tmp_dir)
+    print(f"✅ Resumed MD run has {len(frames)} frames and no duplicate steps")
+    test_results.append(("MD Checkpoint Resume", True, None))
+except Exception as e:
+    print(f"❌ MD checkpoint resume failed: {e}")
+    test_results.append(("MD Checkpoint Resume", False, str(e)))
+
+print()
+
 # Summary
 print("=" * 70)
 print("📊 TEST SUMMARY")
@@ -222,12 +222,15 @@ def main():
             tools.generate_sqs_from_poscar,
             tools.generate_surface_slab_from_poscar,
             tools.generate_interface_from_poscars,
+            tools.screen_interfaces_from_poscars,
             tools.generate_vasp_workflow_of_convergence_tests,
             tools.generate_vasp_workflow_of_eos,
             tools.generate_vasp_workflow_of_elastic_constants,
             tools.generate_vasp_workflow_of_aimd,
             tools.generate_vasp_workflow_of_neb,
             tools.run_simulation_using_mlps,
+            tools.run_batch_screening_using_mlps,
+            tools.run_md_temperature_sweep_using_mlps,
             tools.analyze_features_for_machine_learning,
             tools.reduce_dimensions_for_machine_learning,
             tools.augment_data_for_machine_learning,
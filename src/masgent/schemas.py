@@ -1,6 +1,6 @@
 # !/usr/bin/env python3
 
-import os, re
+import os, re, glob, importlib.util
 import pandas as pd
 from ase.io import read
 from pymatgen.core import Structure
@@ -798,6 +798,16 @@ class GenerateInterfaceFromPoscars(BaseModel):
         description='If True, apply shape filtering to keep only the most square-like interfaces. If False, keep all matching interfaces. Defaults to False if not provided.'
     )
 
+    export_slabs: bool = Field(
+        True,
+        description='If True, also write the unmatched surface slabs to the "slabs" folder. The interfaces are built from in-memory slabs either way. Defaults to True if not provided.'
+    )
+
+    top_k: Optional[int] = Field(
+        None,
+        description='If set, keep only the top_k best matches ranked by area and misfit, so memory stays bounded for large searches. Defaults to None (keep all matches) if not provided.'
+    )
+
     @model_validator(mode='after')
     def validator(self):
         # ensure lower POSCAR exists
@@ -858,6 +868,130 @@ class GenerateInterfaceFromPoscars(BaseModel):
         if self.angle_tolerance < 0:
             raise ValueError('Angle tolerance must be a non-negative number.')
         
+        # validate top_k
+        if self.top_k is not None and self.top_k < 1:
+            raise ValueError('Number of kept matches (top_k) must be at least 1.')
+        
+    
+class ScreenInterfacesFromPoscars(BaseModel):
+    '''
+    Schema for screening lattice matched interfaces between two given POSCAR files over Miller indices.
+    '''
+    
+    lower_poscar_path: str = Field(
+        ...,
+        description='Path to the lower POSCAR file. Must exist.'
+    )
+
+    upper_poscar_path: str = Field(
+        ...,
+        description='Path to the upper POSCAR file. Must exist.'
+    )
+
+    max_hkl: int = Field(
+        1,
+        description='Maximum value of each Miller index h, k, l enumerated for both surfaces. Defaults to 1 if not provided.'
+    )
+
+    lower_slab_layers: int = Field(
+        4,
+        description='Number of atomic layers in the lower slab. Defaults to 4 if not provided.'
+    )
+
+    upper_slab_layers: int = Field(
+        4,
+        description='Number of atomic layers in the upper slab. Defaults to 4 if not provided.'
+    )
+
+    slab_vacuum: float = Field(
+        15.0,
+        description='Vacuum thickness in Angstroms. Defaults to 15.0 Å if not provided.'
+    )
+
+    max_area: float = Field(
+        500.0,
+        description='Maximum interface area in square Angstroms. Defaults to 500.0 Å² if not provided.'
+    )
+
+    uv_tolerance: float = Field(
+        5.0,
+        description='Tolerance for matching in-plane lattice vectors in percentage. Defaults to 5.0% if not provided.'
+    )
+
+    angle_tolerance: float = Field(
+        5.0,
+        description='Tolerance for angle matching between in-plane lattice vectors in degrees. Defaults to 5.0° if not provided.'
+    )
+
+    n_workers: int = Field(
+        4,
+        description='Number of worker processes matching hkl pairs in parallel. Defaults to 4 if not provided.'
+    )
+
+    top_n: int = Field(
+        20,
+        description='Number of best ranked matches returned in the response, the full table is always written. Defaults to 20 if not provided.'
+    )
+
+    @model_validator(mode='after')
+    def validator(self):
+        # ensure lower POSCAR exists
+        if not os.path.isfile(self.lower_poscar_path):
+            raise ValueError(f'Lower POSCAR file not found: {self.lower_poscar_path}')
+        
+        # ensure the lower poscar file is valid POSCAR
+        try:
+            _ = Structure.from_file(self.lower_poscar_path)
+        except Exception as e:
+            raise ValueError(f'Invalid lower POSCAR file: {self.lower_poscar_path}')
+        
+        # ensure upper POSCAR exists
+        if not os.path.isfile(self.upper_poscar_path):
+            raise ValueError(f'Upper POSCAR file not found: {self.upper_poscar_path}')
+        
+        # ensure the upper poscar file is valid POSCAR
+        try:
+            _ = Structure.from_file(self.upper_poscar_path)
+        except Exception as e:
+            raise ValueError(f'Invalid upper POSCAR file: {self.upper_poscar_path}')
+        
+        # validate max_hkl
+        if self.max_hkl < 1:
+            raise ValueError('Maximum Miller index (max_hkl) must be integer at least 1.')
+
+        # validate lower_slab_layers
+        if self.lower_slab_layers < 1:
+            raise ValueError('Number of lower slab layers must be integer at least 1.')
+        
+        # validate upper_slab_layers
+        if self.upper_slab_layers < 1:
+            raise ValueError('Number of upper slab layers must be integer at least 1.')
+        
+        # validate slab_vacuum
+        if self.slab_vacuum <= 0:
+            raise ValueError('Slab vacuum thickness must be a positive number.')
+        
+        # validate max_area
+        if self.max_area <= 0:
+            raise ValueError('Maximum interface area must be a positive number.')
+        
+        # validate uv_tolerance
+        if self.uv_tolerance < 0:
+            raise ValueError('UV tolerance must be a non-negative number.')
+        
+        # validate angle_tolerance
+        if self.angle_tolerance < 0:
+            raise ValueError('Angle tolerance must be a non-negative number.')
+        
+        # validate n_workers
+        if self.n_workers < 1:
+            raise ValueError('Number of worker processes (n_workers) must be at least 1.')
+        
+        # validate top_n
+        if self.top_n < 1:
+            raise ValueError('Number of returned matches (top_n) must be at least 1.')
+
+        return self
     
 class GenerateVaspWorkflowOfConvergenceTests(BaseModel):
     '''
@@ -1108,6 +1242,36 @@ class RunSimulationUsingMlps(BaseModel):
         description='Time step in femtoseconds for molecular dynamics simulations. Defaults to 5.0 fs if not provided.'
     )
 
+    device: Literal['auto', 'cpu', 'cuda'] = Field(
+        'auto',
+        description='Device to run the MLPs on. "auto" keeps the default device of each MLPs. Defaults to "auto" if not provided.'
+    )
+
+    precision: Literal['float32-high', 'float32-highest', 'float64'] = Field(
+        'float32-high',
+        description='Floating point precision of the model (only used by Orb-v3). Defaults to "float32-high" if not provided.'
+    )
+
+    n_workers: int = Field(
+        1,
+        description='Number of worker processes for independent relaxations (EOS scale points, elastic strain states). Defaults to 1 (serial) if not provided.'
+    )
+
+    md_frame_format: Literal['traj', 'npz'] = Field(
+        'traj',
+        description='Format of the molecular dynamics frames: "traj" for an ASE trajectory file, "npz" for chunked compressed frames suited to long runs. Defaults to "traj" if not provided.'
+    )
+
+    md_checkpoint_interval: int = Field(
+        1000,
+        description='Interval in steps between molecular dynamics checkpoints (positions, velocities, thermostat state and step counter). Defaults to 1000 if not provided.'
+    )
+
+    resume: bool = Field(
+        False,
+        description='Whether to resume the molecular dynamics simulation from the latest checkpoint, appending to the existing trajectory and log. Defaults to False if not provided.'
+    )
+
     @model_validator(mode='after')
     def validator(self):
         # ensure POSCAR exists
@@ -1139,9 +1303,145 @@ class RunSimulationUsingMlps(BaseModel):
         # validate md_timestep
         if self.md_timestep <= 0:
             raise ValueError('Molecular dynamics time step (md_timestep) must be a positive number.')
+        
+        # validate n_workers
+        if self.n_workers < 1:
+            raise ValueError('Number of worker processes (n_workers) must be at least 1.')
+        
+        # validate md_checkpoint_interval
+        if self.md_checkpoint_interval < 1:
+            raise ValueError('Molecular dynamics checkpoint interval (md_checkpoint_interval) must be at least 1.')
+
+        return self
+
+
+class RunMdTemperatureSweepUsingMlps(BaseModel):
+    '''
+    Schema for running molecular dynamics replicas at several temperatures using machine learning potentials (MLPs).
+    '''
+    temperatures: List[int] = Field(
+        ...,
+        description='List of temperatures in Kelvin, one NVT replica per temperature.'
+    )
+
+    poscar_path: str = Field(
+        os.path.join(os.environ.get('MASGENT_SESSION_RUNS_DIR', ''), 'POSCAR'),
+        description='Path to the POSCAR file. Defaults to "POSCAR" in current directory if not provided.'
+    )
+
+    mlps_type: Literal['SevenNet', 'CHGNet', 'Orb-v3', 'MatSim'] = Field(
+        'CHGNet',
+        description='Type of machine learning potentials (MLPs) to use. Defaults to "CHGNet" if not provided.'
+    )
+
+    md_steps: int = Field(
+        1000,
+        description='Number of molecular dynamics steps per replica. Defaults to 1000 if not provided.'
+    )
+
+    md_timestep: float = Field(
+        5.0,
+        description='Time step in femtoseconds for molecular dynamics simulations. Defaults to 5.0 fs if not provided.'
+    )
+
+    n_workers: int = Field(
+        4,
+        description='Number of worker processes running replicas in parallel. Defaults to 4 if not provided.'
+    )
+
+    md_frame_format: Literal['traj', 'npz'] = Field(
+        'traj',
+        description='Format of the molecular dynamics frames: "traj" for an ASE trajectory file, "npz" for chunked compressed frames. Defaults to "traj" if not provided.'
+    )
+
+    device: Literal['auto', 'cpu', 'cuda'] = Field(
+        'auto',
+        description='Device to run the MLPs on. "auto" keeps the default device of each MLPs. Defaults to "auto" if not provided.'
+    )
+
+    precision: Literal['float32-high', 'float32-highest', 'float64'] = Field(
+        'float32-high',
+        description='Floating point precision of the model (only used by Orb-v3). Defaults to "float32-high" if not provided.'
+    )
+
+    @model_validator(mode='after')
+    def validator(self):
+        # ensure POSCAR exists
+        if not os.path.isfile(self.poscar_path):
+            raise ValueError(f'POSCAR file not found: {self.poscar_path}')
+        
+        # ensure the poscar file is valid POSCAR
+        try:
+            _ = Structure.from_file(self.poscar_path)
+        except Exception as e:
+            raise ValueError(f'Invalid POSCAR file: {self.poscar_path}')
+        
+        # validate temperatures
+        if not self.temperatures:
+            raise ValueError('At least one temperature must be provided.')
+        if any(T < 0 for T in self.temperatures):
+            raise ValueError('Temperatures must be non-negative numbers.')
+        if len(set(self.temperatures)) != len(self.temperatures):
+            raise ValueError('Temperatures must be unique.')
+        
+        # validate md_steps
+        if self.md_steps < 1:
+            raise ValueError('Number of molecular dynamics steps (md_steps) must be at least 1.')
+        
+        # validate md_timestep
+        if self.md_timestep <= 0:
+            raise ValueError('Molecular dynamics time step (md_timestep) must be a positive number.')
+        
+        # validate n_workers
+        if self.n_workers < 1:
+            raise ValueError('Number of worker processes (n_workers) must be at least 1.')
 
         return self
 
+class RunBatchScreeningUsingMlps(BaseModel):
+    '''
+    Schema for single-point batch screening of many structures using machine learning potentials (MLPs).
+    '''
+    structures_path: str = Field(
+        ...,
+        description='Directory containing the structure files, or a glob pattern matching them (e.g. "POSCARs/Si/POSCAR_*"). Must match at least one file.'
+    )
+
+    mlps_type: Literal['SevenNet', 'CHGNet', 'Orb-v3', 'MatSim'] = Field(
+        'CHGNet',
+        description='Type of machine learning potentials (MLPs) to use. Defaults to "CHGNet" if not provided.'
+    )
+
+    batch_size: int = Field(
+        32,
+        description='Number of structures read and evaluated per batch, only CHGNet runs a batch as one batched forward pass. Defaults to 32 if not provided.'
+    )
+
+    device: Literal['auto', 'cpu', 'cuda'] = Field(
+        'auto',
+        description='Device to run the MLPs on. "auto" keeps the default device of each MLPs. Defaults to "auto" if not provided.'
+    )
+
+    precision: Literal['float32-high', 'float32-highest', 'float64'] = Field(
+        'float32-high',
+        description='Floating point precision of the model (only used by Orb-v3). Defaults to "float32-high" if not provided.'
+    )
+
+    @model_validator(mode='after')
+    def validator(self):
+        # ensure the directory or glob pattern matches at least one file
+        if os.path.isdir(self.structures_path):
+            files = glob.glob(os.path.join(self.structures_path, '*'))
+        else:
+            files = glob.glob(self.structures_path)
+        if not any(os.path.isfile(f) for f in files):
+            raise ValueError(f'No structure files found in: {self.structures_path}')
+        
+        # validate batch_size
+        if self.batch_size < 1:
+            raise ValueError('Batch size (batch_size) must be at least 1.')
+
+        return self
 
 class AnalyzeFeaturesForMachineLearning(BaseModel):
     '''
@@ -1237,6 +1537,21 @@ class AugmentDataForMachineLearning(BaseModel):
         description='Number of augmented data points to generate. Defaults to 100 if not provided.'
     )
 
+    chunk_size: int = Field(
+        10000,
+        description='Number of augmented data points decoded and written per batch, bounding the memory of large augmentations. Defaults to 10000 if not provided.'
+    )
+
+    output_format: Literal['csv', 'parquet'] = Field(
+        'csv',
+        description='File format of the augmented datasets: "csv" or "parquet" (requires pyarrow, the masgent[parquet] extra). The model design and training tools read CSV. Defaults to "csv" if not provided.'
+    )
+
+    valid_fraction: float = Field(
+        0.0,
+        description='Fraction of the data held out to early-stop the CVAE training on the validation loss, 0 monitors the training loss instead. Defaults to 0.0 if not provided.'
+    )
+
     @model_validator(mode='after')
     def validator(self):
         # ensure input dataset exists
@@ -1258,6 +1573,18 @@ class AugmentDataForMachineLearning(BaseModel):
         # ensure num_augmentations is valid
         if self.num_augmentations < 1:
             raise ValueError('Number of augmented data points (num_augmentations) must be at least 1.')
+        
+        # ensure chunk_size is valid
+        if self.chunk_size < 1:
+            raise ValueError('Number of augmented data points per batch (chunk_size) must be at least 1.')
+        
+        # ensure valid_fraction is valid
+        if not 0.0 <= self.valid_fraction < 1.0:
+            raise ValueError('Validation fraction (valid_fraction) must be in [0, 1).')
+
+        # ensure pyarrow is available before any training when parquet output is requested
+        if self.output_format == 'parquet' and importlib.util.find_spec('pyarrow') is None:
+            raise ValueError('Parquet output (output_format = "parquet") requires pyarrow, install it with: pip install "masgent[parquet]", or use output_format = "csv".')
 
         return self
     
@@ -1280,6 +1607,21 @@ class DesignModelForMachineLearning(BaseModel):
         description='Number of Optuna trials for hyperparameter optimization. Defaults to 100 if not provided.'
     )
 
+    n_workers: int = Field(
+        1,
+        description='Number of worker processes running Optuna trials in parallel on the shared study storage. Defaults to 1 if not provided.'
+    )
+
+    resume: bool = Field(
+        False,
+        description='If True, continue the study stored in the design directory from an interrupted run until n_trials are finished. Defaults to False if not provided.'
+    )
+
+    pruner: Literal['median', 'hyperband', 'successive_halving', 'none'] = Field(
+        'median',
+        description='Optuna pruner that stops unpromising trials early based on the validation loss reported during training: "median", "hyperband", "successive_halving", or "none". Defaults to "median" if not provided.'
+    )
+
     @model_validator(mode='after')
     def validator(self):
         # ensure input dataset exists
@@ -1306,6 +1648,10 @@ class DesignModelForMachineLearning(BaseModel):
         # ensure n_trials is valid
         if self.n_trials < 1:
             raise ValueError('Number of Optuna trials (n_trials) must be at least 1.')
+        
+        # ensure n_workers is valid
+        if self.n_workers < 1:
+            raise ValueError('Number of worker processes (n_workers) must be at least 1.')
 
         return self
     
@@ -1343,6 +1689,26 @@ class TrainModelForMachineLearning(BaseModel):
         description='Number of epochs with no improvement after which training will be stopped. Defaults to 50 if not provided.'
     )
 
+    valid_interval: int = Field(
+        1,
+        description='Number of training epochs between two evaluations of the validation loss. Defaults to 1 if not provided.'
+    )
+
+    batch_size: Optional[int] = Field(
+        None,
+        description='If set, train on shuffled mini-batches of this size instead of the full training set per step, recommended for large augmented datasets. Defaults to None (full-batch training) if not provided.'
+    )
+
+    accumulation_steps: int = Field(
+        1,
+        description='Number of mini-batches whose gradients are accumulated before each optimizer step. Only used when batch_size is set. Defaults to 1 if not provided.'
+    )
+
+    lr_scheduler: Literal['none', 'plateau', 'cosine'] = Field(
+        'none',
+        description='Learning-rate scheduler: "none", "plateau" (halve the learning rate when the validation loss stalls) or "cosine" (cosine annealing over max_epochs). Defaults to "none" if not provided.'
+    )
+
     @model_validator(mode='after')
     def validator(self):
         # ensure input dataset exists
@@ -1389,5 +1755,17 @@ class TrainModelForMachineLearning(BaseModel):
         # ensure patience is valid
         if self.patience < 1:
             raise ValueError('Patience must be at least 1.')
+        
+        # ensure valid_interval is valid
+        if self.valid_interval < 1:
+            raise ValueError('Validation interval (valid_interval) must be at least 1.')
+        
+        # ensure batch_size is valid
+        if self.batch_size is not None and self.batch_size < 1:
+            raise ValueError('Mini-batch size (batch_size) must be at least 1.')
+        
+        # ensure accumulation_steps is valid
+        if self.accumulation_steps < 1:
+            raise ValueError('Number of gradient accumulation steps (accumulation_steps) must be at least 1.')
 
         return self
\ No newline at end of file
@@ -24,13 +24,14 @@ from pymatgen.io.vasp.sets import (
 
 from masgent import schemas
 from masgent.utils.utils import (
-    write_comments,
+    write_vasp_file,
     ask_for_mp_api_key,
     validate_mp_api_key,
     generate_batch_script,
     list_files_in_dir,
     fit_eos,
     create_deformation_matrices,
+    VaspInputCache,
     )
 
 # Track whether Materials Project key has been checked during this process
@@ -176,11 +177,9 @@ def generate_vasp_poscar(formula: str) -> dict:
         structure_0 = mpr.get_structure_by_material_id(mid_0)
         poscar_0 = Poscar(structure_0)
         # Save as POSCAR_{formula} and rewrite POSCAR
-        poscar_0.write_file(os.path.join(runs_dir, 'POSCAR'), direct=True)
-        poscar_0.write_file(os.path.join(runs_dir, f'POSCAR_{formula}'), direct=True)
         comments_0 = f'# (Most Stable) Generated by Masgent from Materials Project entry {mid_0}, crystal system: {docs[0].symmetry.crystal_system}, space group: {docs[0].symmetry.symbol}.'
-        write_comments(os.path.join(runs_dir, 'POSCAR'), 'poscar', comments_0)
-        write_comments(os.path.join(runs_dir, f'POSCAR_{formula}'), 'poscar', comments_0)
+        write_vasp_file(poscar_0, os.path.join(runs_dir, 'POSCAR'), 'poscar', comments_0, direct=True)
+        write_vasp_file(poscar_0, os.path.join(runs_dir, f'POSCAR_{formula}'), 'poscar', comments_0, direct=True)
         
         # Save all matched structures in the poscars directory
         for doc in docs:
@@ -192,10 +191,9 @@ def generate_vasp_poscar(formula: str) -> dict:
 
             # If "/" in space group symbol, replace with "_"
             space_group_symbol_ = space_group_symbol.replace('/', '_')
-            poscar.write_file(os.path.join(poscars_dir, f'POSCAR_{crystal_system}_{space_group_symbol_}_{mid}'), direct=True)
 
             comments = f'# Generated by Masgent from Materials Project entry {mid}, crystal system: {crystal_system}, space group: {space_group_symbol}.'
-            write_comments(os.path.join(poscars_dir, f'POSCAR_{crystal_system}_{space_group_symbol_}_{mid}'), 'poscar', comments)
+            write_vasp_file(poscar, os.path.join(poscars_dir, f'POSCAR_{crystal_system}_{space_group_symbol_}_{mid}'), 'poscar', comments, direct=True)
         
         poscar_files = list_files_in_dir(poscars_dir) + [os.path.join(runs_dir, 'POSCAR')]
         
@@ -265,27 +263,23 @@ def generate_vasp_inputs_from_poscar(
         vis = vis_class(structure)
 
         if only_incar:
-            vis.incar.write_file(os.path.join(vasp_inputs_dir, 'INCAR'))
             vis.poscar.write_file(os.path.join(vasp_inputs_dir, 'POSCAR'))
             incar_comments = f'# Generated by Masgent using {vasp_input_sets} set provided by Materials Project.'
-            write_comments(os.path.join(vasp_inputs_dir, 'INCAR'), 'incar', incar_comments)
+            write_vasp_file(vis.incar, os.path.join(vasp_inputs_dir, 'INCAR'), 'incar', incar_comments)
             return {
                 'status': 'success',
                 'message': f'Generated INCAR based on {vasp_input_sets} in {vasp_inputs_dir}.',
                 'incar_path': os.path.join(vasp_inputs_dir, 'INCAR'),
             }
         
-        vis.incar.write_file(os.path.join(vasp_inputs_dir, 'INCAR'))
-        vis.poscar.write_file(os.path.join(vasp_inputs_dir, 'POSCAR'))
-        vis.kpoints.write_file(os.path.join(vasp_inputs_dir, 'KPOINTS'))
         vis.potcar.write_file(os.path.join(vasp_inputs_dir, 'POTCAR'))
 
         incar_comments = f'# Generated by Masgent using {vasp_input_sets} set provided by Materials Project.'
-        write_comments(os.path.join(vasp_inputs_dir, 'INCAR'), 'incar', incar_comments)
+        write_vasp_file(vis.incar, os.path.join(vasp_inputs_dir, 'INCAR'), 'incar', incar_comments)
         poscar_comments = f'# Generated by Masgent using {vasp_input_sets} set provided by Materials Project.'
-        write_comments(os.path.join(vasp_inputs_dir, 'POSCAR'), 'poscar', poscar_comments)
+        write_vasp_file(vis.poscar, os.path.join(vasp_inputs_dir, 'POSCAR'), 'poscar', poscar_comments)
         kpoints_comments = f'# Generated by Masgent using {vasp_input_sets} set provided by Materials Project.'
-        write_comments(os.path.join(vasp_inputs_dir, 'KPOINTS'), 'kpoints', kpoints_comments)
+        write_vasp_file(vis.kpoints, os.path.join(vasp_inputs_dir, 'KPOINTS'), 'kpoints', kpoints_comments)
         
         return {
             'status': 'success',
@@ -469,10 +463,9 @@ def convert_poscar_coordinates(
         
         structure = Structure.from_file(poscar_path)
         poscar = Poscar(structure)
-        poscar.write_file(os.path.join(convert_dir, 'POSCAR'), direct=not to_cartesian)
         coord_type = 'Cartesian' if to_cartesian else 'Direct'
         comments = f'# Generated by Masgent converted to {coord_type} coordinates.'
-        write_comments(os.path.join(convert_dir, 'POSCAR'), 'poscar', comments)
+        write_vasp_file(poscar, os.path.join(convert_dir, 'POSCAR'), 'poscar', comments, direct=not to_cartesian)
 
         return {
             'status': 'success',
@@ -524,9 +517,8 @@ def customize_vasp_kpoints_with_accuracy(
         
         structure = Structure.from_file(poscar_path)
         kpoints = Kpoints.automatic_density(structure, kppa=kppa)
-        kpoints.write_file(os.path.join(runs_dir, 'KPOINTS'))
         comments = f'# Generated by Masgent with {accuracy_level} accuracy (Grid Density = {kppa} / number of atoms)'
-        write_comments(os.path.join(runs_dir, 'KPOINTS'), 'kpoints', comments)
+        write_vasp_file(kpoints, os.path.join(runs_dir, 'KPOINTS'), 'kpoints', comments)
         
         return {
             'status': 'success',
@@ -585,9 +577,8 @@ def generate_vasp_poscar_with_vacancy_defects(
         vacancy_indices = random.sample(all_indices, num_defects)
         del atoms[vacancy_indices]
 
-        write(os.path.join(defect_dir, 'POSCAR'), atoms, format='vasp', direct=True, sort=True)
         comments = f'# Generated by Masgent with vacancy defects of element {original_element} by randomly removing {num_defects} atoms, be careful to verify structure.'
-        write_comments(os.path.join(defect_dir, 'POSCAR'), 'poscar', comments)
+        write_vasp_file(atoms, os.path.join(defect_dir, 'POSCAR'), 'poscar', comments, direct=True, sort=True)
 
         # return f'\nGenerated POSCAR with vacancy defects in {os.path.join(target_dir, "POSCAR")}.'
         return {
@@ -650,9 +641,8 @@ def generate_vasp_poscar_with_substitution_defects(
         for i in substitution_indices:
             atoms[i].symbol = defect_element
         
-        write(os.path.join(defect_dir, 'POSCAR'), atoms, format='vasp', direct=True, sort=True)
         comments = f'# Generated by Masgent with substitution defect of element {original_element} to {defect_element} by randomly substituting {num_defects} atoms, be careful to verify structure.'
-        write_comments(os.path.join(defect_dir, 'POSCAR'), 'poscar', comments)
+        write_vasp_file(atoms, os.path.join(defect_dir, 'POSCAR'), 'poscar', comments, direct=True, sort=True)
 
         return {
             'status': 'success',
@@ -719,9 +709,8 @@ def generate_vasp_poscar_with_interstitial_defects(
             for i, defect_structure in enumerate(defect_structures):
                 # Convert back to ASE Atoms for writing
                 defect_atoms = defect_structure.to_ase_atoms()
-                write(os.path.join(defect_dir, f'POSCAR_{i}'), defect_atoms, format='vasp', direct=True, sort=True)
                 comments = f'# Generated by Masgent with interstitial (Voronoi) defect of element {defect_element} at fract. coords {defect_sites[i]}, be careful to verify structure.'
-                write_comments(os.path.join(defect_dir, f'POSCAR_{i}'), 'poscar', comments)
+                write_vasp_file(defect_atoms, os.path.join(defect_dir, f'POSCAR_{i}'), 'poscar', comments, direct=True, sort=True)
 
         # return f'\nGenerated POSCAR with interstitial (Voronoi) defects in {target_dir}.'
         return {
@@ -776,10 +765,9 @@ def generate_supercell_from_poscar(
         structure = Structure.from_file(poscar_path).copy()
         supercell_structure = structure.make_supercell(scaling_matrix_)
         supercell_poscar = Poscar(supercell_structure)
-        supercell_poscar.write_file(os.path.join(supercell_dir, 'POSCAR'), direct=True)
         
         comments = f'# Generated by Masgent as supercell with scaling matrix {scaling_matrix}.'
-        write_comments(os.path.join(supercell_dir, 'POSCAR'), 'poscar', comments)
+        write_vasp_file(supercell_poscar, os.path.join(supercell_dir, 'POSCAR'), 'poscar', comments, direct=True)
 
         return {
             'status': 'success',
@@ -904,9 +892,8 @@ def generate_sqs_from_poscar(
                    target_concentrations=target_concentrations,
                    n_steps=mc_steps
                    )
-        write(os.path.join(sqs_dir, 'POSCAR'), sqs, format='vasp', direct=True, sort=True)
         comments = f'# Generated by Masgent as Special Quasirandom Structure (SQS) with target configurations {target_configurations} using icet.'
-        write_comments(os.path.join(sqs_dir, 'POSCAR'), 'poscar', comments)
+        write_vasp_file(sqs, os.path.join(sqs_dir, 'POSCAR'), 'poscar', comments, direct=True, sort=True)
 
         return {
             'status': 'success',
@@ -963,9 +950,8 @@ def generate_surface_slab_from_poscar(
         from ase.build import surface
         bulk_atoms = read(poscar_path, format='vasp')
         slab_atoms = surface(lattice=bulk_atoms, indices=miller_indices, layers=slab_layers, vacuum=vacuum_thickness, tol=1e-10, periodic=True)
-        write(os.path.join(surface_slab_dir, 'POSCAR'), slab_atoms, format='vasp', direct=True, sort=True)
         comments = f'# Generated by Masgent as surface slab with Miller indices {miller_indices}, vacuum thickness {vacuum_thickness} Å, and slab layers {slab_layers}.'
-        write_comments(os.path.join(surface_slab_dir, 'POSCAR'), 'poscar', comments)
+        write_vasp_file(slab_atoms, os.path.join(surface_slab_dir, 'POSCAR'), 'poscar', comments, direct=True, sort=True)
 
         return {
             'status': 'success',
@@ -983,7 +969,7 @@ def generate_surface_slab_from_poscar(
     name='Generate interface from two POSCARs',
     description='Generate VASP POSCAR for interface from two given POSCAR files based on specified parameters',
     requires=['lower_poscar_path', 'upper_poscar_path', 'lower_hkl', 'upper_hkl'],
-    optional=['lower_slab_layers', 'upper_slab_layers', 'slab_vacuum', 'min_area', 'max_area', 'interface_gap', 'uv_tolerance', 'angle_tolerance', 'shape_filter'],
+    optional=['lower_slab_layers', 'upper_slab_layers', 'slab_vacuum', 'min_area', 'max_area', 'interface_gap', 'uv_tolerance', 'angle_tolerance', 'shape_filter', 'export_slabs', 'top_k'],
     defaults={
         'lower_slab_layers': 4,
         'upper_slab_layers': 4,
@@ -994,6 +980,8 @@ def generate_surface_slab_from_poscar(
         'uv_tolerance': 5.0,
         'angle_tolerance': 5.0,
         'shape_filter': False,
+        'export_slabs': True,
+        'top_k': None,
         },
     prereqs=[],
 ))
@@ -1011,6 +999,8 @@ def generate_interface_from_poscars(
     uv_tolerance: float = 5.0,
     angle_tolerance: float = 5.0,
     shape_filter: bool = False,
+    export_slabs: bool = True,
+    top_k: int = None,
 ) -> dict:
     '''
     Generate VASP POSCAR for interface from two given POSCAR files based on specified parameters
@@ -1032,6 +1022,8 @@ def generate_interface_from_poscars(
             uv_tolerance=uv_tolerance,
             angle_tolerance=angle_tolerance,
             shape_filter=shape_filter,
+            export_slabs=export_slabs,
+            top_k=top_k,
         )
     except Exception as e:
         return {
@@ -1061,6 +1053,8 @@ def generate_interface_from_poscars(
             angle_tol=angle_tolerance,
             shape_filter=shape_filter,
             output_dir=interfaces_dir,
+            export_slabs=export_slabs,
+            top_k=top_k,
         )
 
         return {
@@ -1075,6 +1069,96 @@ def generate_interface_from_poscars(
             'message': f'Interface POSCAR generation failed: {str(e)}'
         }
 
+@with_metadata(schemas.ToolMetadata(
+    name='Screen interfaces between two POSCARs over Miller indices',
+    description='High-throughput lattice matching of all lower / upper Miller index pairs up to a maximum index between two POSCAR files, distributed over worker processes, returning a table of matches ranked by area and misfit without writing any structure files',
+    requires=['lower_poscar_path', 'upper_poscar_path'],
+    optional=['max_hkl', 'lower_slab_layers', 'upper_slab_layers', 'slab_vacuum', 'max_area', 'uv_tolerance', 'angle_tolerance', 'n_workers', 'top_n'],
+    defaults={
+        'max_hkl': 1,
+        'lower_slab_layers': 4,
+        'upper_slab_layers': 4,
+        'slab_vacuum': 15.0,
+        'max_area': 500.0,
+        'uv_tolerance': 5.0,
+        'angle_tolerance': 5.0,
+        'n_workers': 4,
+        'top_n': 20,
+        },
+    prereqs=[],
+))
+def screen_interfaces_from_poscars(
+    lower_poscar_path: str,
+    upper_poscar_path: str,
+    max_hkl: int = 1,
+    lower_slab_layers: int = 4,
+    upper_slab_layers: int = 4,
+    slab_vacuum: float = 15.0,
+    max_area: float = 500.0,
+    uv_tolerance: float = 5.0,
+    angle_tolerance: float = 5.0,
+    n_workers: int = 4,
+    top_n: int = 20,
+) -> dict:
+    '''
+    Screen lattice matches between two POSCAR files over all Miller index pairs up to max_hkl
+    '''
+    try:
+        schemas.ScreenInterfacesFromPoscars(
+            lower_poscar_path=lower_poscar_path,
+            upper_poscar_path=upper_poscar_path,
+            max_hkl=max_hkl,
+            lower_slab_layers=lower_slab_layers,
+            upper_slab_layers=upper_slab_layers,
+            slab_vacuum=slab_vacuum,
+            max_area=max_area,
+            uv_tolerance=uv_tolerance,
+            angle_tolerance=angle_tolerance,
+            n_workers=n_workers,
+            top_n=top_n,
+        )
+    except Exception as e:
+        return {
+            'status': 'error',
+            'message': f'Invalid input parameters: {str(e)}'
+        }
+
+    try:
+        runs_dir = os.environ.get('MASGENT_SESSION_RUNS_DIR')
+        
+        screening_dir = os.path.join(runs_dir, 'interface_screening')
+        os.makedirs(screening_dir, exist_ok=True)
+
+        from masgent.utils.interface_maker import run_interface_screening
+        data_matched = run_interface_screening(
+            lower_conv=lower_poscar_path,
+            upper_conv=upper_poscar_path,
+            max_hkl=max_hkl,
+            max_area=max_area,
+            slab_vacuum=slab_vacuum,
+            lower_slab_layers=lower_slab_layers,
+            upper_slab_layers=upper_slab_layers,
+            uv_tol=uv_tolerance,
+            angle_tol=angle_tolerance,
+            n_workers=n_workers,
+            output_dir=screening_dir,
+        )
+
+        screening_df = pd.read_csv(os.path.join(screening_dir, 'interface_screening.csv'), dtype={'Lower hkl': str, 'Upper hkl': str})
+
+        return {
+            'status': 'success',
+            'message': f'Found {len(data_matched)} matched interfaces, ranked in {screening_dir}. Use the chosen lower / upper hkl with the interface generation tool to write the structures.',
+            'interface_screening_csv_path': os.path.join(screening_dir, 'interface_screening.csv'),
+            'top_matches': screening_df.head(top_n).to_dict(orient='records'),
+        }
+    
+    except Exception as e:
+        return {
+            'status': 'error',
+            'message': f'Interface screening failed: {str(e)}'
+        }
+
 @with_metadata(schemas.ToolMetadata(
     name='Generate VASP input files and submit bash script for workflow of convergence tests',
     description='Generate VASP workflow of convergence tests for k-points and energy cutoff based on given POSCAR',
@@ -1116,17 +1200,14 @@ def generate_vasp_workflow_of_convergence_tests(
             os.makedirs(kpoint_tests_dir, exist_ok=True)
             test_dir = os.path.join(kpoint_tests_dir, f'kppa_{kppa}')
             os.makedirs(test_dir, exist_ok=True)
-            vis.incar.write_file(os.path.join(test_dir, 'INCAR'))
-            vis.poscar.write_file(os.path.join(test_dir, 'POSCAR'))
-            vis.potcar.write_file(os.path.join(test_dir, 'POTCAR'))
+            cache.write_potcar(vis, os.path.join(test_dir, 'POTCAR'))
             incar_comments = f'# Generated by Masgent for k-point convergence test with kppa = {kppa}.'
-            write_comments(os.path.join(test_dir, 'INCAR'), 'incar', incar_comments)
+            cache.write_incar(vis, os.path.join(test_dir, 'INCAR'), incar_comments)
             poscar_comments = f'# Generated by Masgent for k-point convergence test with kppa = {kppa}.'
-            write_comments(os.path.join(test_dir, 'POSCAR'), 'poscar', poscar_comments)
+            write_vasp_file(vis.poscar, os.path.join(test_dir, 'POSCAR'), 'poscar', poscar_comments)
             kpoints = Kpoints.automatic_density(structure, kppa=kppa)
-            kpoints.write_file(os.path.join(test_dir, 'KPOINTS'))
             kpoint_comments = f'# Generated by Masgent for k-point convergence test with kppa = {kppa}.'
-            write_comments(os.path.join(test_dir, 'KPOINTS'), 'kpoints', kpoint_comments)
+            write_vasp_file(kpoints, os.path.join(test_dir, 'KPOINTS'), 'kpoints', kpoint_comments)
 
         script_path = os.path.join(kpoint_tests_dir, 'masgent_submit.sh')
         batch_script = generate_batch_script()
@@ -1139,16 +1220,13 @@ def generate_vasp_workflow_of_convergence_tests(
             os.makedirs(encut_tests_dir, exist_ok=True)
             test_dir = os.path.join(encut_tests_dir, f'encut_{encut}')
             os.makedirs(test_dir, exist_ok=True)
-            vis.incar.write_file(os.path.join(test_dir, 'INCAR'))
-            vis.poscar.write_file(os.path.join(test_dir, 'POSCAR'))
-            vis.kpoints.write_file(os.path.join(test_dir, 'KPOINTS'))
-            vis.potcar.write_file(os.path.join(test_dir, 'POTCAR'))
+            cache.write_potcar(vis, os.path.join(test_dir, 'POTCAR'))
             incar_comments = f'# Generated by Masgent for energy cutoff convergence test with ENCUT = {encut}.'
-            write_comments(os.path.join(test_dir, 'INCAR'), 'incar', incar_comments)
+            cache.write_incar(vis, os.path.join(test_dir, 'INCAR'), incar_comments)
             poscar_comments = f'# Generated by Masgent for energy cutoff convergence test with ENCUT = {encut}.'
-            write_comments(os.path.join(test_dir, 'POSCAR'), 'poscar', poscar_comments)
+            write_vasp_file(vis.poscar, os.path.join(test_dir, 'POSCAR'), 'poscar', poscar_comments)
             kpoint_comments = f'# Generated by Masgent for energy cutoff convergence test with ENCUT = {encut}.'
-            write_comments(os.path.join(test_dir, 'KPOINTS'), 'kpoints', kpoint_comments)
+            write_vasp_file(vis.kpoints, os.path.join(test_dir, 'KPOINTS'), 'kpoints', kpoint_comments)
 
         script_path = os.path.join(encut_tests_dir, 'masgent_submit.sh')
         batch_script = generate_batch_script()
@@ -1164,6 +1242,9 @@ def generate_vasp_workflow_of_convergence_tests(
 
         structure = Structure.from_file(poscar_path)
 
+        # INCAR and POTCAR are shared by all test directories, build them once
+        cache = VaspInputCache()
+
         if test_type == 'kpoints':
             test_kpoints()
         elif test_type == 'encut':
@@ -1227,22 +1308,22 @@ def generate_vasp_workflow_of_eos(
         
         structure = Structure.from_file(poscar_path)
 
+        # Scaling keeps the species, so INCAR and POTCAR are built once for all scale factors
+        cache = VaspInputCache()
+
         for scale in scale_factors:
             scaled_structure = structure.copy()
             scaled_structure.scale_lattice(structure.volume * scale)
             vis = MPStaticSet(scaled_structure)
             scale_dir = os.path.join(eos_dir, f'scale_{scale:.3f}')
             os.makedirs(scale_dir, exist_ok=True)
-            vis.incar.write_file(os.path.join(scale_dir, 'INCAR'))
-            vis.poscar.write_file(os.path.join(scale_dir, 'POSCAR'))
-            vis.kpoints.write_file(os.path.join(scale_dir, 'KPOINTS'))
-            vis.potcar.write_file(os.path.join(scale_dir, 'POTCAR'))
+            cache.write_potcar(vis, os.path.join(scale_dir, 'POTCAR'))
             incar_comments = f'# Generated by Masgent for EOS calculation with scale factor = {scale:.3f}.'
-            write_comments(os.path.join(scale_dir, 'INCAR'), 'incar', incar_comments)
+            cache.write_incar(vis, os.path.join(scale_dir, 'INCAR'), incar_comments)
             poscar_comments = f'# Generated by Masgent for EOS calculation with scale factor = {scale:.3f}.'
-            write_comments(os.path.join(scale_dir, 'POSCAR'), 'poscar', poscar_comments)
+            write_vasp_file(vis.poscar, os.path.join(scale_dir, 'POSCAR'), 'poscar', poscar_comments)
             kpoint_comments = f'# Generated by Masgent for EOS calculation with scale factor = {scale:.3f}.'
-            write_comments(os.path.join(scale_dir, 'KPOINTS'), 'kpoints', kpoint_comments)
+            write_vasp_file(vis.kpoints, os.path.join(scale_dir, 'KPOINTS'), 'kpoints', kpoint_comments)
 
         script_path = os.path.join(eos_dir, 'masgent_submit.sh')
         batch_script = generate_batch_script()
@@ -1296,6 +1377,9 @@ def generate_vasp_workflow_of_elastic_constants(
 
         D_all = create_deformation_matrices()
 
+        # Strain keeps the species, so INCAR and POTCAR are built once for all deformations
+        cache = VaspInputCache()
+
         for D_dict in D_all:
             folder_name = list(D_dict.keys())[0]
             D = D_dict[folder_name]
@@ -1305,16 +1389,13 @@ def generate_vasp_workflow_of_elastic_constants(
             vis = MVLElasticSet(structure_deformed)
             deform_dir = os.path.join(elastic_dir, folder_name)
             os.makedirs(deform_dir, exist_ok=True)
-            vis.incar.write_file(os.path.join(deform_dir, 'INCAR'))
-            vis.poscar.write_file(os.path.join(deform_dir, 'POSCAR'))
-            vis.kpoints.write_file(os.path.join(deform_dir, 'KPOINTS'))
-            vis.potcar.write_file(os.path.join(deform_dir, 'POTCAR'))
+            cache.write_potcar(vis, os.path.join(deform_dir, 'POTCAR'))
             incar_comments = f'# Generated by Masgent for elastic constants calculation with deformation {folder_name}.'
-            write_comments(os.path.join(deform_dir, 'INCAR'), 'incar', incar_comments)
+            cache.write_incar(vis, os.path.join(deform_dir, 'INCAR'), incar_comments)
             poscar_comments = f'# Generated by Masgent for elastic constants calculation with deformation {folder_name}.'
-            write_comments(os.path.join(deform_dir, 'POSCAR'), 'poscar', poscar_comments)
+            write_vasp_file(vis.poscar, os.path.join(deform_dir, 'POSCAR'), 'poscar', poscar_comments)
             kpoint_comments = f'# Generated by Masgent for elastic constants calculation with deformation {folder_name}.'
-            write_comments(os.path.join(deform_dir, 'KPOINTS'), 'kpoints', kpoint_comments)
+            write_vasp_file(vis.kpoints, os.path.join(deform_dir, 'KPOINTS'), 'kpoints', kpoint_comments)
         
         script_path = os.path.join(elastic_dir, 'masgent_submit.sh')
         batch_script = generate_batch_script()
@@ -1380,16 +1461,13 @@ def generate_vasp_workflow_of_aimd(
         structure = Structure.from_file(poscar_path)
         
         vis = MPMDSet(structure, user_incar_settings={'SMASS': 0, 'IBRION': 0, 'TEBEG': temperature, 'TEEND': temperature, 'NSW': md_steps, 'POTIM': md_timestep})
-        vis.incar.write_file(os.path.join(aimd_dir, 'INCAR'))
-        vis.poscar.write_file(os.path.join(aimd_dir, 'POSCAR'))
-        vis.kpoints.write_file(os.path.join(aimd_dir, 'KPOINTS'))
         vis.potcar.write_file(os.path.join(aimd_dir, 'POTCAR'))
         incar_comments = f'# Generated by Masgent for AIMD simulation at {temperature} K for {md_steps} steps with timestep {md_timestep} fs.'
-        write_comments(os.path.join(aimd_dir, 'INCAR'), 'incar', incar_comments)
+        write_vasp_file(vis.incar, os.path.join(aimd_dir, 'INCAR'), 'incar', incar_comments)
         poscar_comments = f'# Generated by Masgent for AIMD simulation at {temperature} K for {md_steps} steps with timestep {md_timestep} fs.'
-        write_comments(os.path.join(aimd_dir, 'POSCAR'), 'poscar', poscar_comments)
+        write_vasp_file(vis.poscar, os.path.join(aimd_dir, 'POSCAR'), 'poscar', poscar_comments)
         kpoint_comments = f'# Generated by Masgent for AIMD simulation at {temperature} K for {md_steps} steps with timestep {md_timestep} fs.'
-        write_comments(os.path.join(aimd_dir, 'KPOINTS'), 'kpoints', kpoint_comments)
+        write_vasp_file(vis.kpoints, os.path.join(aimd_dir, 'KPOINTS'), 'kpoints', kpoint_comments)
 
         script_path = os.path.join(aimd_dir, 'masgent_submit.sh')
         batch_script = generate_batch_script()
@@ -1455,13 +1533,11 @@ def generate_vasp_workflow_of_neb(
 
         pmg_images = [Structure.from_ase_atoms(img) for img in images]
         vis = NEBSet(pmg_images)
-        vis.incar.write_file(os.path.join(neb_dir, 'INCAR'))
-        vis.kpoints.write_file(os.path.join(neb_dir, 'KPOINTS'))
         vis.potcar.write_file(os.path.join(neb_dir, 'POTCAR'))
         incar_comments = f'# Generated by Masgent for NEB calculation with {num_images} images.'
-        write_comments(os.path.join(neb_dir, 'INCAR'), 'incar', incar_comments)
+        write_vasp_file(vis.incar, os.path.join(neb_dir, 'INCAR'), 'incar', incar_comments)
         kpoint_comments = f'# Generated by Masgent for NEB calculation with {num_images} images.'
-        write_comments(os.path.join(neb_dir, 'KPOINTS'), 'kpoints', kpoint_comments)
+        write_vasp_file(vis.kpoints, os.path.join(neb_dir, 'KPOINTS'), 'kpoints', kpoint_comments)
         
         scripts = f'''#!/bin/bash
 #SBATCH --partition=normal
@@ -1484,9 +1560,8 @@ srun vasp_std > vasp_neb.out
         for i, image in enumerate(images):
             image_dir = os.path.join(neb_dir, f'{i:0{padding}d}')
             os.makedirs(image_dir, exist_ok=True)
-            write(os.path.join(image_dir, 'POSCAR'), image, format='vasp', direct=True, sort=True)
             poscar_comments = f'# Generated by Masgent for NEB calculation image {i}.'
-            write_comments(os.path.join(image_dir, 'POSCAR'), 'poscar', poscar_comments)
+            write_vasp_file(image, os.path.join(image_dir, 'POSCAR'), 'poscar', poscar_comments, direct=True, sort=True)
 
         neb_files = list_files_in_dir(neb_dir) if os.path.exists(neb_dir) else []
         
@@ -1507,7 +1582,7 @@ srun vasp_std > vasp_neb.out
     name='Run simulation using machine learning potentials (MLPs)',
     description='Run simulation using machine learning potentials (MLPs) based on given POSCAR. Supported tasks include: single point calculation, equation of state (EOS), elastic constants, and molecular dynamics (MD) simulations.',
     requires=[],
-    optional=['poscar_path', 'mlps_type', 'task_type', 'fmax', 'max_steps', 'temperature', 'md_steps', 'md_timestep'],
+    optional=['poscar_path', 'mlps_type', 'task_type', 'fmax', 'max_steps', 'temperature', 'md_steps', 'md_timestep', 'device', 'precision', 'n_workers', 'md_frame_format', 'md_checkpoint_interval', 'resume'],
     defaults={
         'poscar_path': f'{os.environ.get("MASGENT_SESSION_RUNS_DIR")}/POSCAR',
         'mlps_type': 'CHGNet',
@@ -1517,6 +1592,12 @@ srun vasp_std > vasp_neb.out
         'temperature': 1000,
         'md_steps': 1000,
         'md_timestep': 5.0,
+        'device': 'auto',
+        'precision': 'float32-high',
+        'n_workers': 1,
+        'md_frame_format': 'traj',
+        'md_checkpoint_interval': 1000,
+        'resume': False,
         },
     prereqs=[],
 ))
@@ -1529,6 +1610,12 @@ def run_simulation_using_mlps(
     temperature: int = 1000,
     md_steps: int = 1000,
     md_timestep: float = 5.0,
+    device: Literal['auto', 'cpu', 'cuda'] = 'auto',
+    precision: Literal['float32-high', 'float32-highest', 'float64'] = 'float32-high',
+    n_workers: int = 1,
+    md_frame_format: Literal['traj', 'npz'] = 'traj',
+    md_checkpoint_interval: int = 1000,
+    resume: bool = False,
 ) -> dict:
     '''
     Run simulation using machine learning potentials (MLPs) based on given POSCAR.
@@ -1556,48 +1643,6 @@ def run_simulation_using_mlps(
         ax.legend(frameon=True, loc='upper right')
         plt.savefig(f'{task_dir}/eos_curve.png', dpi=330)
 
-    def parse_and_plot_md_log(logfile, mlps_type, task_dir):
-        import matplotlib
-        matplotlib.use('Agg')  # Use non-interactive backend for plotting
-        import matplotlib.pyplot as plt
-        import seaborn as sns
-
-        with open(logfile, 'r') as f:
-            lines = f.readlines()
-        data_lines = [line for line in lines if re.match(r'^\s*\d+\.\d+', line)]
-        data = []
-        for line in data_lines:
-            parts = line.split()
-            if len(parts) >= 5:
-                time_ps = float(parts[0])
-                etot_per_atom = float(parts[1])
-                epot_per_atom = float(parts[2])
-                ekin_per_atom = float(parts[3])
-                temperature_k = float(parts[4])
-                data.append({
-                    'Time[ps]': time_ps,
-                    'Etot/N[eV]': etot_per_atom,
-                    'Epot/N[eV]': epot_per_atom,
-                    'Ekin/N[eV]': ekin_per_atom,
-                    'T[K]': temperature_k
-                })
-        df = pd.DataFrame(data)
-        sns.set_theme(font_scale=1.2, style='whitegrid')
-        matplotlib.rcParams['xtick.direction'] = 'in'
-        matplotlib.rcParams['ytick.direction'] = 'in'
-        fig, ax = plt.subplots(4, 1, figsize=(8, 6), sharex=True, sharey=False, constrained_layout=True)
-        ax[0].plot(df['Time[ps]'], df['Etot/N[eV]'], color='C0')
-        ax[1].plot(df['Time[ps]'], df['Epot/N[eV]'], color='C1')
-        ax[2].plot(df['Time[ps]'], df['Ekin/N[eV]'], color='C2')
-        ax[3].plot(df['Time[ps]'], df['T[K]'], label='T', color='C3')
-        ax[0].set_ylabel('$E_{tot}$ (eV/atom)')
-        ax[1].set_ylabel('$E_{pot}$ (eV/atom)')
-        ax[2].set_ylabel('$E_{kin}$ (eV/atom)')
-        ax[3].set_ylabel('$T$ (K)')
-        ax[3].set_xlabel('Time (ps)')
-        ax[0].set_title(f'Masgent MD using {mlps_type}')
-        plt.savefig(f'{task_dir}/md_log.png', dpi=330)
-    
     try:
         schemas.RunSimulationUsingMlps(
             poscar_path=poscar_path,
@@ -1605,6 +1650,12 @@ def run_simulation_using_mlps(
             fmax=fmax,
             max_steps=max_steps,
             task_type=task_type,
+            device=device,
+            precision=precision,
+            n_workers=n_workers,
+            md_frame_format=md_frame_format,
+            md_checkpoint_interval=md_checkpoint_interval,
+            resume=resume,
         )
     except Exception as e:
         return {
@@ -1620,28 +1671,10 @@ def run_simulation_using_mlps(
 
         scale_factors = [0.94, 0.96, 0.98, 1.00, 1.02, 1.04, 1.06]
 
-        if mlps_type == 'SevenNet':
-            from sevenn.calculator import SevenNetCalculator
-            calc = SevenNetCalculator(model='7net-0')
-        elif mlps_type == 'CHGNet':
-            from chgnet.model.dynamics import CHGNetCalculator
-            calc = CHGNetCalculator()
-        elif mlps_type == 'Orb-v3':
-            from orb_models.forcefield import pretrained
-            from orb_models.forcefield.calculator import ORBCalculator
-            orbff = pretrained.orb_v3_conservative_inf_omat(
-            device='cpu',
-            precision="float32-high",   # or "float32-highest" / "float64
-            )
-            calc = ORBCalculator(orbff, device='cpu')
-        elif mlps_type == 'MatSim':
-            from mattersim.forcefield import MatterSimCalculator
-            calc = MatterSimCalculator()
-        else:
-            return {
-                'status': 'error',
-                'message': f'Invalid MLPs type: {mlps_type}.'
-            }
+        # Reuse a warm calculator across tool calls instead of reloading the model weights
+        from masgent.utils.mlps import use_calculator, calculator_pool_stats, run_in_pool, relax_eos_point, relax_strain_state, run_md
+        # The calculator is only loaded where it runs, spawned pool workers load their own copy
+        device_ = None if device == 'auto' else device
         
         from ase.filters import FrechetCellFilter
         from ase.optimize import LBFGS
@@ -1650,13 +1683,13 @@ def run_simulation_using_mlps(
             task_dir = os.path.join(mlps_simulation_dir, 'single')
             os.makedirs(task_dir, exist_ok=True)
             atoms = read(poscar_path, format='vasp')
-            atoms.calc = calc
-            opt = LBFGS(FrechetCellFilter(atoms), logfile=f'{task_dir}/masgent_mlps_single.log')
-            opt.run(fmax=fmax, steps=max_steps)
-            atoms.write(f'{task_dir}/CONTCAR', format='vasp', direct=True, sort=True)
+            with use_calculator(mlps_type, device=device_, precision=precision) as calc:
+                atoms.calc = calc
+                opt = LBFGS(FrechetCellFilter(atoms), logfile=f'{task_dir}/masgent_mlps_single.log')
+                opt.run(fmax=fmax, steps=max_steps)
+                total_energy = atoms.get_potential_energy()
             comments = f'# Generated by Masgent from simulation using {mlps_type} with fmax = {fmax} eV/Å.'
-            write_comments(f'{task_dir}/CONTCAR', 'poscar', comments)
-            total_energy = atoms.get_potential_energy()
+            write_vasp_file(atoms, f'{task_dir}/CONTCAR', 'poscar', comments, direct=True, sort=True)
             energy_per_atom = total_energy / len(atoms)
             return {
                 'status': 'success',
@@ -1666,34 +1699,20 @@ def run_simulation_using_mlps(
                 'contcar_path': f'{task_dir}/CONTCAR',
                 'total_energy (eV)': total_energy,
                 'energy_per_atom (eV/atom)': energy_per_atom,
+                'calculator_pool': calculator_pool_stats(),
             }
         elif task_type == 'eos':
             task_dir = os.path.join(mlps_simulation_dir, 'eos')
             os.makedirs(task_dir, exist_ok=True)
             structure = Structure.from_file(poscar_path)
-            volumes, energies = [], []
-            for scale in scale_factors:
-                # Create scaled structure
-                scaled_structure = structure.copy()
-                scaled_structure.scale_lattice(structure.volume * scale)
-                scaled_structure_path = os.path.join(task_dir, f'POSCAR_{scale:.3f}')
-                scaled_structure.to(fmt='poscar', filename=scaled_structure_path)
-                comments = f'# Generated by Masgent for EOS calculation with scale factor = {scale:.3f} using {mlps_type}.'
-                write_comments(scaled_structure_path, 'poscar', comments)
-                # Load scaled structure and perform optimization
-                atoms = read(scaled_structure_path, format='vasp')
-                atoms.calc = calc
-                # opt = LBFGS(FrechetCellFilter(atoms), logfile=f'{task_dir}/masgent_mlps_eos_{scale:.3f}.log')
-                opt = LBFGS(atoms, logfile=f'{task_dir}/masgent_mlps_eos_{scale:.3f}.log')
-                opt.run(fmax=fmax, steps=max_steps)
-                atoms.write(f'{task_dir}/CONTCAR_{scale:.3f}', format='vasp', direct=True, sort=True)
-                comments = f'# Generated by Masgent from simulation using {mlps_type} with fmax = {fmax} eV/Å.'
-                write_comments(f'{task_dir}/CONTCAR_{scale:.3f}', 'poscar', comments)
-                energy_per_atom = atoms.get_potential_energy() / len(atoms)
-                volumes.append(atoms.get_volume())
-                energies.append(energy_per_atom)
+            # Scale points are independent, relax them in parallel if n_workers > 1
+            tasks = [(structure, scale, mlps_type, device_, precision, fmax, max_steps, task_dir) for scale in scale_factors]
+            results = run_in_pool(relax_eos_point, tasks, n_workers, mlps_type, device=device_, precision=precision)
+            volumes = [r['volume'] for r in results]
+            energies = [r['energy'] for r in results]
+            wall_times = [r['wall_time'] for r in results]
             # Save EOS results to CSV
-            pd.DataFrame({'Scale Factor': scale_factors, 'Volume (Å³)': volumes, 'Energy (eV/atom)': energies}).to_csv(f'{task_dir}/eos_cal.csv', index=False, float_format='%.8f')
+            pd.DataFrame({'Scale Factor': scale_factors, 'Volume (Å³)': volumes, 'Energy (eV/atom)': energies, 'Wall Time (s)': wall_times}).to_csv(f'{task_dir}/eos_cal.csv', index=False, float_format='%.8f')
             # Fit and plot EOS
             fit_and_plot_eos(volumes, energies, mlps_type, task_dir)
             return {
@@ -1702,6 +1721,8 @@ def run_simulation_using_mlps(
                 'mlps_simulation_dir': mlps_simulation_dir,
                 'eos_cal_csv_path': f'{task_dir}/eos_cal.csv',
                 'eos_curve_png_path': f'{task_dir}/eos_curve.png',
+                'eos_total_wall_time (s)': sum(wall_times),
+                'calculator_pool': calculator_pool_stats(),
             }
         elif task_type == 'elastic':
             from pymatgen.analysis.elasticity.strain import Strain
@@ -1712,29 +1733,17 @@ def run_simulation_using_mlps(
             os.makedirs(task_dir, exist_ok=True)
             structure = Structure.from_file(poscar_path)
             D_all = create_deformation_matrices()
-            strains, stresses = [], []
+            # Build the deformed structures in memory and relax the strain states in parallel if n_workers > 1
+            tasks = []
             for D_dict in D_all:
                 folder_name = list(D_dict.keys())[0]
                 D = D_dict[folder_name]
-                # Create deformed structure
                 deformed_structure = structure.copy()
                 deformed_structure.apply_strain(D)
-                deformed_structure_path = os.path.join(task_dir, f'POSCAR_{folder_name}')
-                deformed_structure.to_ase_atoms().write(deformed_structure_path, format='vasp', direct=True, sort=True)
-                comments = f'# Generated by Masgent for elastic constants calculation with deformation {folder_name} using {mlps_type}.'
-                write_comments(deformed_structure_path, 'poscar', comments)
-                # Load deformed structure and perform optimization
-                atoms = read(deformed_structure_path, format='vasp')
-                atoms.calc = calc
-                opt = LBFGS(FrechetCellFilter(atoms), logfile=f'{task_dir}/masgent_mlps_elastic_{folder_name}.log')
-                opt.run(fmax=fmax, steps=max_steps)
-                atoms.write(f'{task_dir}/CONTCAR_{folder_name}', format='vasp', direct=True, sort=True)
-                comments = f'# Generated by Masgent from simulation using {mlps_type} with fmax = {fmax} eV/Å.'
-                write_comments(f'{task_dir}/CONTCAR_{folder_name}', 'poscar', comments)
-                stress = atoms.get_stress(voigt=True)  # in eV/Å³
-                stress_gpa = stress * 160.21766208  # convert to GPa
-                stresses.append(stress_gpa.tolist())
-                strains.append(D)
+                tasks.append((deformed_structure.to_ase_atoms(), folder_name, mlps_type, device_, precision, fmax, max_steps, task_dir))
+            results = run_in_pool(relax_strain_state, tasks, n_workers, mlps_type, device=device_, precision=precision)
+            strains = [list(D_dict.values())[0] for D_dict in D_all]
+            stresses = [r['stress'] for r in results]
             # Calculate elastic constants and other properties
             pmg_strains = [Strain(eps) for eps in strains]
             pmg_stresses = [Stress.from_voigt(sig) for sig in stresses]
@@ -1764,45 +1773,42 @@ def run_simulation_using_mlps(
                 'message': f'Completed elastic constants simulation using {mlps_type} in {mlps_simulation_dir}.',
                 'mlps_simulation_dir': mlps_simulation_dir,
                 'elastic_constants_path': f'{task_dir}/elastic_constants.txt',
+                'elastic_total_wall_time (s)': sum(r['wall_time'] for r in results),
+                'calculator_pool': calculator_pool_stats(),
             }
         elif task_type == 'md':
-            from ase import units
-            from ase.md.velocitydistribution import MaxwellBoltzmannDistribution, Stationary
-            from ase.md.nose_hoover_chain import NoseHooverChainNVT
-            from ase.md import MDLogger
-
             task_dir = os.path.join(mlps_simulation_dir, 'md')
             os.makedirs(task_dir, exist_ok=True)
             atoms = read(poscar_path, format='vasp')
-            atoms.calc = calc
-            MaxwellBoltzmannDistribution(atoms, temperature_K=temperature)
-            Stationary(atoms)
-            dyn = NoseHooverChainNVT(
-                atoms=atoms,
-                timestep=md_timestep * units.fs,
-                temperature_K=temperature,
-                tdamp=100 * md_timestep * units.fs,
-                trajectory=f'{task_dir}/masgent_mlps_md.traj',
-                loginterval=10,
-                append_trajectory=False,
-            )
-            dyn.attach(MDLogger(
-                dyn=dyn,
-                atoms=atoms,
-                logfile=f'{task_dir}/masgent_mlps_md.log',
-                header=True,
-                peratom=True,
-                mode='w',
-            ), interval=10)
-            dyn.run(md_steps)
-            parse_and_plot_md_log(f'{task_dir}/masgent_mlps_md.log', mlps_type, task_dir)
+            # Frames and observables are streamed to disk as the run progresses, no log reparsing afterwards
+            # With resume = True the run continues from the latest checkpoint in task_dir
+            with use_calculator(mlps_type, device=device_, precision=precision) as calc:
+                md_result = run_md(
+                    atoms=atoms,
+                    calc=calc,
+                    task_dir=task_dir,
+                    mlps_type=mlps_type,
+                    temperature=temperature,
+                    md_steps=md_steps,
+                    md_timestep=md_timestep,
+                    frame_format=md_frame_format,
+                    checkpoint_interval=md_checkpoint_interval,
+                    resume=resume,
+                )
             return {
                 'status': 'success',
                 'message': f'Completed MD simulation using {mlps_type} in {mlps_simulation_dir}.',
                 'mlps_simulation_dir': mlps_simulation_dir,
-                'md_trajectory_path': f'{task_dir}/masgent_mlps_md.traj',
-                'md_log_path': f'{task_dir}/masgent_mlps_md.log',
-                'md_log_png_path': f'{task_dir}/md_log.png',
+                'md_trajectory_path': md_result['md_trajectory_path'],
+                'md_log_path': md_result['md_log_path'],
+                'md_observables_csv_path': md_result['md_observables_csv_path'],
+                'md_rdf_csv_path': md_result['md_rdf_csv_path'],
+                'md_log_png_path': md_result['md_log_png_path'],
+                'md_checkpoint_path': md_result['md_checkpoint_path'],
+                'md_resumed_from_step': md_result['resumed_from_step'],
+                'md_averages': md_result['averages'],
+                'md_diffusion_coefficient (cm²/s)': md_result['diffusion_coefficient'],
+                'calculator_pool': calculator_pool_stats(),
             }
         else:
             return {
@@ -1816,6 +1822,171 @@ def run_simulation_using_mlps(
             'message': f'Simulation using MLPs failed: {str(e)}'
         }
 
+@with_metadata(schemas.ToolMetadata(
+    name='Run molecular dynamics temperature sweep using machine learning potentials (MLPs)',
+    description='Run independent NVT molecular dynamics replicas of one POSCAR at several temperatures in parallel worker processes using machine learning potentials (MLPs), and summarize per-temperature averages and diffusion coefficients in one table.',
+    requires=['temperatures'],
+    optional=['poscar_path', 'mlps_type', 'md_steps', 'md_timestep', 'n_workers', 'md_frame_format', 'device', 'precision'],
+    defaults={
+        'poscar_path': f'{os.environ.get("MASGENT_SESSION_RUNS_DIR")}/POSCAR',
+        'mlps_type': 'CHGNet',
+        'md_steps': 1000,
+        'md_timestep': 5.0,
+        'n_workers': 4,
+        'md_frame_format': 'traj',
+        'device': 'auto',
+        'precision': 'float32-high',
+        },
+    prereqs=[],
+))
+def run_md_temperature_sweep_using_mlps(
+    temperatures: List[int],
+    poscar_path: str = f'{os.environ.get("MASGENT_SESSION_RUNS_DIR")}/POSCAR',
+    mlps_type: Literal['SevenNet', 'CHGNet', 'Orb-v3', 'MatSim'] = 'CHGNet',
+    md_steps: int = 1000,
+    md_timestep: float = 5.0,
+    n_workers: int = 4,
+    md_frame_format: Literal['traj', 'npz'] = 'traj',
+    device: Literal['auto', 'cpu', 'cuda'] = 'auto',
+    precision: Literal['float32-high', 'float32-highest', 'float64'] = 'float32-high',
+) -> dict:
+    '''
+    Run NVT molecular dynamics replicas at several temperatures in parallel using machine learning potentials (MLPs).
+    '''
+    try:
+        schemas.RunMdTemperatureSweepUsingMlps(
+            temperatures=temperatures,
+            poscar_path=poscar_path,
+            mlps_type=mlps_type,
+            md_steps=md_steps,
+            md_timestep=md_timestep,
+            n_workers=n_workers,
+            md_frame_format=md_frame_format,
+            device=device,
+            precision=precision,
+        )
+    except Exception as e:
+        return {
+            'status': 'error',
+            'message': f'Invalid input parameters: {str(e)}'
+        }
+
+    try:
+        runs_dir = os.environ.get('MASGENT_SESSION_RUNS_DIR')
+
+        task_dir = os.path.join(runs_dir, f'mlps_simulation/{mlps_type}/md_sweep')
+        os.makedirs(task_dir, exist_ok=True)
+
+        from masgent.utils.mlps import run_in_pool, run_md_replica
+
+        # Replicas are independent, each worker keeps one warm calculator for all of its replicas
+        device_ = None if device == 'auto' else device
+        tasks = [(poscar_path, T, mlps_type, device_, precision, md_steps, md_timestep, md_frame_format, task_dir) for T in temperatures]
+        results = run_in_pool(run_md_replica, tasks, n_workers, mlps_type, device=device_, precision=precision)
+
+        summary_df = pd.DataFrame({
+            'Target T (K)': temperatures,
+            'Average T (K)': [r['averages']['T[K]'] for r in results],
+            'Average Etot (eV/atom)': [r['averages']['Etot/N[eV]'] for r in results],
+            'Average Epot (eV/atom)': [r['averages']['Epot/N[eV]'] for r in results],
+            'Average Ekin (eV/atom)': [r['averages']['Ekin/N[eV]'] for r in results],
+            'Diffusion Coefficient (cm²/s)': [r['diffusion_coefficient'] for r in results],
+            'Wall Time (s)': [r['wall_time'] for r in results],
+        })
+        summary_df.to_csv(os.path.join(task_dir, 'md_sweep_summary.csv'), index=False, float_format='%.8g')
+
+        return {
+            'status': 'success',
+            'message': f'Completed MD temperature sweep at {len(temperatures)} temperatures using {mlps_type} in {task_dir}.',
+            'md_sweep_dir': task_dir,
+            'md_sweep_summary_csv_path': os.path.join(task_dir, 'md_sweep_summary.csv'),
+            'md_sweep_summary': summary_df.to_dict(orient='records'),
+        }
+
+    except Exception as e:
+        return {
+            'status': 'error',
+            'message': f'MD temperature sweep using MLPs failed: {str(e)}'
+        }
+
+@with_metadata(schemas.ToolMetadata(
+    name='Run batch screening using machine learning potentials (MLPs)',
+    description='Run single-point screening of many structures (a directory or glob pattern of structure files) using machine learning potentials (MLPs), reading them in batches and writing one consolidated CSV of energies, forces and stresses. Only CHGNet evaluates a batch in one batched forward pass, SevenNet, Orb-v3 and MatSim evaluate the structures of a batch one at a time.',
+    requires=['structures_path'],
+    optional=['mlps_type', 'batch_size', 'device', 'precision'],
+    defaults={
+        'mlps_type': 'CHGNet',
+        'batch_size': 32,
+        'device': 'auto',
+        'precision': 'float32-high',
+        },
+    prereqs=[],
+))
+def run_batch_screening_using_mlps(
+    structures_path: str,
+    mlps_type: Literal['SevenNet', 'CHGNet', 'Orb-v3', 'MatSim'] = 'CHGNet',
+    batch_size: int = 32,
+    device: Literal['auto', 'cpu', 'cuda'] = 'auto',
+    precision: Literal['float32-high', 'float32-highest', 'float64'] = 'float32-high',
+) -> dict:
+    '''
+    Run single-point batch screening of many structures using machine learning potentials (MLPs).
+    '''
+    try:
+        schemas.RunBatchScreeningUsingMlps(
+            structures_path=structures_path,
+            mlps_type=mlps_type,
+            batch_size=batch_size,
+            device=device,
+            precision=precision,
+        )
+    except Exception as e:
+        return {
+            'status': 'error',
+            'message': f'Invalid input parameters: {str(e)}'
+        }
+
+    try:
+        runs_dir = os.environ.get('MASGENT_SESSION_RUNS_DIR')
+
+        task_dir = os.path.join(runs_dir, f'mlps_simulation/{mlps_type}/batch')
+        os.makedirs(task_dir, exist_ok=True)
+
+        from masgent.utils.mlps import collect_structure_files, run_batch_screening, calculator_pool_stats
+
+        structure_files = collect_structure_files(structures_path)
+        result = run_batch_screening(
+            structure_files=structure_files,
+            mlps_type=mlps_type,
+            device=None if device == 'auto' else device,
+            precision=precision,
+            batch_size=batch_size,
+            task_dir=task_dir,
+        )
+        if not result['screened']:
+            return {
+                'status': 'error',
+                'message': f'No readable structure files found in {structures_path}.'
+            }
+
+        lowest_name, lowest_energy = min(result['screened'], key=lambda x: x[1])
+        return {
+            'status': 'success',
+            'message': f'Completed batch screening of {len(result["screened"])} structures using {mlps_type} in {task_dir}.',
+            'batch_screening_csv_path': result['screening_csv'],
+            'batch_forces_csv_path': result['forces_csv'],
+            'lowest_energy_structure': lowest_name,
+            'lowest_energy_per_atom (eV/atom)': lowest_energy,
+            'failed_files': result['failed'],
+            'calculator_pool': calculator_pool_stats(),
+        }
+
+    except Exception as e:
+        return {
+            'status': 'error',
+            'message': f'Batch screening using MLPs failed: {str(e)}'
+        }
+
 @with_metadata(schemas.ToolMetadata(
     name='Analyze features for machine learning',
     description='Analyze features (correlation matrix) for machine learning based on given input and output datasets',
@@ -1960,14 +2131,17 @@ def reduce_dimensions_for_machine_learning(
     name='Augment data for machine learning',
     description='Augment data for machine learning based on given input and output datasets using VAE-based method',
     requires=['input_data_path', 'output_data_path'],
-    optional=['num_augmentations', 'max_epochs', 'loss_threshold'],
-    defaults={'num_augmentations': 100},
+    optional=['num_augmentations', 'max_epochs', 'loss_threshold', 'chunk_size', 'output_format', 'valid_fraction'],
+    defaults={'num_augmentations': 100, 'chunk_size': 10000, 'output_format': 'csv', 'valid_fraction': 0.0},
     prereqs=[],
 ))
 def augment_data_for_machine_learning(
     input_data_path: str,
     output_data_path: str,
     num_augmentations: int = 100,
+    chunk_size: int = 10000,
+    output_format: Literal['csv', 'parquet'] = 'csv',
+    valid_fraction: float = 0.0,
 ) -> dict:
     '''
     Augment data for machine learning by VAE-based method
@@ -1977,6 +2151,9 @@ def augment_data_for_machine_learning(
             input_data_path=input_data_path,
             output_data_path=output_data_path,
             num_augmentations=num_augmentations,
+            chunk_size=chunk_size,
+            output_format=output_format,
+            valid_fraction=valid_fraction,
         )
     except Exception as e:
         return {
@@ -1996,21 +2173,32 @@ def augment_data_for_machine_learning(
         input_df = pd.read_csv(input_data_path)
         output_df = pd.read_csv(output_data_path)
 
-        # Run VAE for data augmentation
-        from masgent.utils.cave import run_cvae_augmentation
+        from masgent.utils.cave import fit_cvae, iter_cvae_samples, ChunkWriter
+
+        cvae_models_dir = os.path.join(machine_learning_dir, 'cvae_models')
+        input_data_augmented_path = os.path.join(ml_data_augmentation_dir, f'ml_input_data_augmented.{output_format}')
+        output_data_augmented_path = os.path.join(ml_data_augmentation_dir, f'ml_output_data_augmented.{output_format}')
+
+        # Train the CVAE, or reuse the one persisted in cvae_models_dir for the same data and hyperparameters
+        cvae, x_scaler, y_scaler, cvae_model_path, cvae_training_log_path, cvae_reused = fit_cvae(input_df, output_df, valid_fraction=valid_fraction, cache_dir=cvae_models_dir)
 
-        x_aug_df, y_aug_df = run_cvae_augmentation(input_df=input_df, output_df=output_df, num_aug=num_augmentations)
-        x_all_df = pd.concat([input_df, x_aug_df], ignore_index=True)
-        y_all_df = pd.concat([output_df, y_aug_df], ignore_index=True)
-        x_all_df.to_csv(os.path.join(ml_data_augmentation_dir, 'ml_input_data_augmented.csv'), index=False, float_format='%.8f')
-        y_all_df.to_csv(os.path.join(ml_data_augmentation_dir, 'ml_output_data_augmented.csv'), index=False, float_format='%.8f')
+        # Run VAE for data augmentation, the original rows come first and the augmented rows are streamed after them chunk by chunk
+        with ChunkWriter(input_data_augmented_path) as x_writer, ChunkWriter(output_data_augmented_path) as y_writer:
+            x_writer.write(input_df)
+            y_writer.write(output_df)
+            for x_aug_df, y_aug_df in iter_cvae_samples(cvae, x_scaler, y_scaler, input_df, output_df, num_aug=num_augmentations, chunk_size=chunk_size):
+                x_writer.write(x_aug_df)
+                y_writer.write(y_aug_df)
 
         return {
             'status': 'success',
-            'message': f'Completed data augmentation for machine learning in {ml_data_augmentation_dir}.',
+            'message': f'Completed data augmentation for machine learning in {ml_data_augmentation_dir}' + (f' (reused the trained CVAE {cvae_model_path}, no training was run).' if cvae_reused else '.'),
             'ml_data_augmentation_dir': ml_data_augmentation_dir,
-            'input_data_augmented_path': os.path.join(ml_data_augmentation_dir, 'ml_input_data_augmented.csv'),
-            'output_data_augmented_path': os.path.join(ml_data_augmentation_dir, 'ml_output_data_augmented.csv'),
+            'input_data_augmented_path': input_data_augmented_path,
+            'output_data_augmented_path': output_data_augmented_path,
+            'cvae_training_log_path': cvae_training_log_path,
+            'cvae_model_path': cvae_model_path,
+            'cvae_reused': cvae_reused,
         }
     
     except Exception as e:
@@ -2023,14 +2211,17 @@ def augment_data_for_machine_learning(
     name='Design model for machine learning',
     description='Design model for machine learning using Optuna-based hyperparameter optimization based on given input and output datasets',
     requires=['input_data_path', 'output_data_path'],
-    optional=['n_trials'],
-    defaults={'n_trials': 100},
+    optional=['n_trials', 'n_workers', 'resume', 'pruner'],
+    defaults={'n_trials': 100, 'n_workers': 1, 'resume': False, 'pruner': 'median'},
     prereqs=[],
 ))
 def design_model_for_machine_learning(
     input_data_path: str,
     output_data_path: str,
     n_trials: int = 100,
+    n_workers: int = 1,
+    resume: bool = False,
+    pruner: Literal['median', 'hyperband', 'successive_halving', 'none'] = 'median',
 ) -> dict:
     '''
     Design model for machine learning using Optuna-based hyperparameter optimization
@@ -2040,6 +2231,9 @@ def design_model_for_machine_learning(
             input_data_path=input_data_path,
             output_data_path=output_data_path,
             n_trials=n_trials,
+            n_workers=n_workers,
+            resume=resume,
+            pruner=pruner,
         )
     except Exception as e:
         return {
@@ -2064,12 +2258,17 @@ def design_model_for_machine_learning(
             output_data=output_data_path,
             save_path=ml_model_design_dir,
             n_trials=n_trials,
+            n_workers=n_workers,
+            resume=resume,
+            pruner=pruner,
         )
 
         return {
             'status': 'success',
             'message': f'Completed model design for machine learning in {ml_model_design_dir}.',
             'ml_model_design_dir': ml_model_design_dir,
+            'study_db_path': os.path.join(ml_model_design_dir, 'study.db'),
+            'study_progress_path': os.path.join(ml_model_design_dir, 'study_progress.log'),
         }
     
     except Exception as e:
@@ -2082,8 +2281,8 @@ def design_model_for_machine_learning(
     name='Train & evaluate model for machine learning',
     description='Train model for machine learning based on given input and output datasets as well as best model structure and parameters',
     requires=['input_data_path', 'output_data_path', 'best_model_path', 'best_model_params_path'],
-    optional=['max_epochs', 'patience'],
-    defaults={'max_epochs': 1000, 'patience': 50},
+    optional=['max_epochs', 'patience', 'valid_interval', 'batch_size', 'accumulation_steps', 'lr_scheduler'],
+    defaults={'max_epochs': 1000, 'patience': 50, 'valid_interval': 1, 'batch_size': None, 'accumulation_steps': 1, 'lr_scheduler': 'none'},
     prereqs=[],
 ))
 def train_model_for_machine_learning(
@@ -2093,6 +2292,10 @@ def train_model_for_machine_learning(
     best_model_params_path: str,
     max_epochs: int = 1000,
     patience: int = 50,
+    valid_interval: int = 1,
+    batch_size: int = None,
+    accumulation_steps: int = 1,
+    lr_scheduler: Literal['none', 'plateau', 'cosine'] = 'none',
 ) -> dict:
     '''
     Train & evaluate model for machine learning based on given input and output datasets as well as best model structure and parameters
@@ -2105,6 +2308,10 @@ def train_model_for_machine_learning(
             best_model_params_path=best_model_params_path,
             max_epochs=max_epochs,
             patience=patience,
+            valid_interval=valid_interval,
+            batch_size=batch_size,
+            accumulation_steps=accumulation_steps,
+            lr_scheduler=lr_scheduler,
         )
     except Exception as e:
         return {
@@ -2132,6 +2339,10 @@ def train_model_for_machine_learning(
             epochs=max_epochs,
             patience=patience,
             save_path=ml_model_training_dir,
+            valid_interval=valid_interval,
+            batch_size=batch_size,
+            accumulation_steps=accumulation_steps,
+            lr_scheduler=lr_scheduler,
         )
 
         return {
@@ -1,8 +1,13 @@
 
+import os
+import copy
+import json
+import hashlib
 import numpy as np
 import pandas as pd
 from tqdm import tqdm
 from sklearn.discriminant_analysis import StandardScaler
+from sklearn.model_selection import train_test_split
 import torch
 import torch.nn as nn
 from torch.nn.functional import mse_loss
@@ -65,47 +70,159 @@ def cvae_loss(x, x_recon, mu, logvar):
     kl = -0.5 * torch.mean(1 + logvar - mu.pow(2) - logvar.exp())
     return recon + kl
 
+# Mean CVAE loss over all samples of a loader without updating the model
+def evaluate_cvae(model, loader):
+    model.eval()
+    loss_sum = 0.0
+    with torch.no_grad():
+        for x_batch, y_batch in loader:
+            x_recon, mu, logvar = model(x_batch, y_batch)
+            loss_sum += cvae_loss(x_batch, x_recon, mu, logvar).item() * len(x_batch)
+    model.train()
+    return loss_sum / len(loader.dataset)
+
 # Training function for CVAE
-def train_cvae(model, loader, epochs=500, lr=1e-3, patience=50):
+def train_cvae(model, loader, epochs=500, lr=1e-3, patience=50, valid_loader=None, log_path=None):
+    '''
+    Early stopping monitors the epoch-mean validation loss, or the epoch-mean training loss without valid_loader.
+    The weights of the best epoch are restored before returning.
+    '''
     opt = torch.optim.Adam(model.parameters(), lr=lr)
     best_loss = np.inf
+    best_state = copy.deepcopy(model.state_dict())
     wait = 0
+    history = []
 
+    model.train()
     for epoch in tqdm(range(epochs), desc="Training CVAE"):
+        loss_sum = 0.0
         for x_batch, y_batch in loader:
             opt.zero_grad()
             x_recon, mu, logvar = model(x_batch, y_batch)
             loss = cvae_loss(x_batch, x_recon, mu, logvar)
             loss.backward()
             opt.step()
+            loss_sum += loss.item() * len(x_batch)
+        train_loss = loss_sum / len(loader.dataset)
+        valid_loss = evaluate_cvae(model, valid_loader) if valid_loader is not None else np.nan
+        history.append([epoch, train_loss, valid_loss])
 
         # Early stopping
-        if loss.item() < best_loss:
-            best_loss = loss.item()
+        monitor = valid_loss if valid_loader is not None else train_loss
+        if monitor < best_loss:
+            best_loss = monitor
+            best_state = copy.deepcopy(model.state_dict())
             wait = 0
         else:
             wait += 1
             if wait > patience:
                 break
 
+    model.load_state_dict(best_state)
+
+    if log_path is not None:
+        log_df = pd.DataFrame(history, columns=['epoch', 'train_loss', 'valid_loss'])
+        log_df.to_csv(log_path, index=False, float_format='%.8f')
+
     return model
 
 # Function to generate conditional samples using trained CVAE
-def generate_conditional_samples(model, y_cond, num_samples=1):
+def generate_conditional_samples(model, y_cond, num_samples=1, chunk_size=10000):
+    '''
+    Decode x for every row of y_cond, a single row is repeated num_samples times.
+    Latents are decoded in batches of chunk_size under no_grad.
+    '''
     model.eval()
-    latent_dim = model.latent_dim
-    y_tensor = torch.tensor(y_cond, dtype=torch.float32)
+    y_cond = np.asarray(y_cond, dtype=np.float32).reshape(-1, model.y_dim)
+    if len(y_cond) == 1:
+        y_cond = np.repeat(y_cond, num_samples, axis=0)
 
     x_aug_list = []
-    for _ in range(num_samples):
-        z = torch.randn((1, latent_dim))
-        x_aug = model.decode(z, y_tensor).detach().numpy().flatten()
-        x_aug_list.append(x_aug)
+    with torch.no_grad():
+        for start in range(0, len(y_cond), chunk_size):
+            y_tensor = torch.from_numpy(y_cond[start:start + chunk_size])
+            z = torch.randn((len(y_tensor), model.latent_dim))
+            x_aug_list.append(model.decode(z, y_tensor).numpy())
 
-    return np.array(x_aug_list)
+    return np.concatenate(x_aug_list)
+
+# Writer that appends DataFrame chunks to a CSV or Parquet file, chosen by the file extension
+class ChunkWriter:
+    def __init__(self, path, float_format='%.8f'):
+        self.path = path
+        self.float_format = float_format
+        self.parquet = os.path.splitext(path)[1].lower() == '.parquet'
+        self.writer = None
+        self.n_rows = 0
+
+    def write(self, df):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df.astype('float64'), preserve_index=False)
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(self.path, table.schema)
+            self.writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode='a' if self.n_rows else 'w', header=not self.n_rows, index=False, float_format=self.float_format)
+        self.n_rows += len(df)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# Hyperparameters of the CVAE used for data augmentation
+CVAE_PARAMS = {'latent_dim': 8, 'hidden_dims': [64, 32, 16], 'batch_size': 64, 'epochs': 500, 'lr': 1e-3, 'patience': 50}
+
+# Content hash of the training data and hyperparameters, used to name persisted CVAE models
+def cvae_cache_key(input_df, output_df, params):
+    h = hashlib.sha256()
+    for df in (input_df, output_df):
+        h.update(json.dumps([str(c) for c in df.columns]).encode())
+        h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    h.update(json.dumps(params, sort_keys=True).encode())
+    return h.hexdigest()[:16]
+
+# Fitted StandardScaler as plain tensors, so cached models load with weights_only=True
+def scaler_to_state(scaler):
+    return {name: torch.from_numpy(np.asarray(getattr(scaler, f'{name}_'), dtype=np.float64)) for name in ('mean', 'var', 'scale')}
+
+def scaler_from_state(state):
+    scaler = StandardScaler()
+    for name in ('mean', 'var', 'scale'):
+        setattr(scaler, f'{name}_', state[name].numpy())
+    scaler.n_features_in_ = len(scaler.mean_)
+    return scaler
+
+# Train a CVAE with its scalers, or load them from cache_dir if the same data and hyperparameters were trained before
+def fit_cvae(input_df, output_df, valid_fraction=0.0, log_path=None, cache_dir=None):
+    '''
+    Returns (cvae, x_scaler, y_scaler, model_path, log_path, reused), model_path is None without cache_dir.
+    With cache_dir the training log is kept next to the model as cvae_<key>.csv, so a reused model
+    reports the log of its own training.
+    '''
+    params = {**CVAE_PARAMS, 'valid_fraction': valid_fraction}
+    model_path = None
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        key = cvae_cache_key(input_df, output_df, params)
+        model_path = os.path.join(cache_dir, f'cvae_{key}.pt')
+        log_path = os.path.join(cache_dir, f'cvae_{key}.csv')
+        if os.path.isfile(model_path):
+            checkpoint = torch.load(model_path, weights_only=True)
+            cvae = CVAE(x_dim=input_df.shape[1], y_dim=output_df.shape[1], latent_dim=checkpoint['params']['latent_dim'], hidden_dims=checkpoint['params']['hidden_dims'])
+            cvae.load_state_dict(checkpoint['state_dict'])
+            x_scaler = scaler_from_state(checkpoint['x_scaler'])
+            y_scaler = scaler_from_state(checkpoint['y_scaler'])
+            return cvae, x_scaler, y_scaler, model_path, log_path if os.path.isfile(log_path) else None, True
 
-# Main function to run CVAE-based data augmentation
-def run_cvae_augmentation(input_df, output_df, num_aug=1000):
     x_dim = input_df.shape[1]
     y_dim = output_df.shape[1]
 
@@ -116,33 +233,66 @@ def run_cvae_augmentation(input_df, output_df, num_aug=1000):
     X = x_scaler.fit_transform(input_df.values)
     Y = y_scaler.fit_transform(output_df.values)
 
+    # Optionally hold out a validation split for early stopping
+    if valid_fraction > 0:
+        X_train, X_valid, Y_train, Y_valid = train_test_split(X, Y, test_size=valid_fraction, shuffle=True, random_state=42)
+        valid_dataset = TensorDataset(
+            torch.tensor(X_valid, dtype=torch.float32),
+            torch.tensor(Y_valid, dtype=torch.float32)
+        )
+        valid_loader = DataLoader(valid_dataset, batch_size=256, shuffle=False)
+    else:
+        X_train, Y_train = X, Y
+        valid_loader = None
+
     dataset = TensorDataset(
-        torch.tensor(X, dtype=torch.float32),
-        torch.tensor(Y, dtype=torch.float32)
+        torch.tensor(X_train, dtype=torch.float32),
+        torch.tensor(Y_train, dtype=torch.float32)
     )
-    loader = DataLoader(dataset, batch_size=64, shuffle=True)
+    loader = DataLoader(dataset, batch_size=params['batch_size'], shuffle=True)
 
-    cvae = CVAE(x_dim=x_dim, y_dim=y_dim, latent_dim=8, hidden_dims=[64, 32, 16])
+    cvae = CVAE(x_dim=x_dim, y_dim=y_dim, latent_dim=params['latent_dim'], hidden_dims=params['hidden_dims'])
 
     # Train CVAE
-    cvae = train_cvae(cvae, loader)
+    cvae = train_cvae(cvae, loader, epochs=params['epochs'], lr=params['lr'], patience=params['patience'], valid_loader=valid_loader, log_path=log_path)
 
-    # Choose random outputs to condition on
-    Y_choices = Y[np.random.choice(len(Y), size=num_aug, replace=True)]
+    # Persist the model with its scalers, written to a temporary file first so a partial file is never loaded
+    if model_path is not None:
+        tmp_path = f'{model_path}.tmp'
+        torch.save({'state_dict': cvae.state_dict(), 'x_scaler': scaler_to_state(x_scaler), 'y_scaler': scaler_to_state(y_scaler), 'params': params}, tmp_path)
+        os.replace(tmp_path, model_path)
 
-    # Generate synthetic X conditioned on Y
-    X_aug_std = []
-    for y_cond in Y_choices:
-        sample = generate_conditional_samples(cvae, y_cond.reshape(1, -1), num_samples=1)
-        X_aug_std.append(sample[0])
+    return cvae, x_scaler, y_scaler, model_path, log_path, False
 
-    X_aug_std = np.array(X_aug_std)
+# Generator that yields augmented (x, y) DataFrames of at most chunk_size rows from a trained CVAE
+def iter_cvae_samples(cvae, x_scaler, y_scaler, input_df, output_df, num_aug=1000, chunk_size=10000):
+    Y = y_scaler.transform(output_df.values)
 
-    # Inverse transform to physical units
-    X_aug = x_scaler.inverse_transform(X_aug_std)
-    Y_aug = y_scaler.inverse_transform(Y_choices)
+    for start in range(0, num_aug, chunk_size):
+        # Choose random outputs to condition on
+        Y_choices = Y[np.random.choice(len(Y), size=min(chunk_size, num_aug - start), replace=True)]
 
-    x_aug_df = pd.DataFrame(X_aug, columns=input_df.columns)
-    y_aug_df = pd.DataFrame(Y_aug, columns=output_df.columns)
+        # Generate synthetic X conditioned on Y in one batched decode
+        X_aug_std = generate_conditional_samples(cvae, Y_choices, chunk_size=chunk_size)
+
+        # Inverse transform to physical units
+        X_aug = x_scaler.inverse_transform(X_aug_std)
+        Y_aug = y_scaler.inverse_transform(Y_choices)
+
+        x_aug_df = pd.DataFrame(X_aug, columns=input_df.columns)
+        y_aug_df = pd.DataFrame(Y_aug, columns=output_df.columns)
+
+        yield x_aug_df, y_aug_df
+
+# Generator that trains (or loads) the CVAE and yields augmented (x, y) DataFrames of at most chunk_size rows
+def iter_cvae_augmentation(input_df, output_df, num_aug=1000, chunk_size=10000, valid_fraction=0.0, log_path=None, cache_dir=None):
+    cvae, x_scaler, y_scaler, _, _, _ = fit_cvae(input_df, output_df, valid_fraction=valid_fraction, log_path=log_path, cache_dir=cache_dir)
+    yield from iter_cvae_samples(cvae, x_scaler, y_scaler, input_df, output_df, num_aug=num_aug, chunk_size=chunk_size)
+
+# Main function to run CVAE-based data augmentation
+def run_cvae_augmentation(input_df, output_df, num_aug=1000, chunk_size=10000, valid_fraction=0.0, log_path=None, cache_dir=None):
+    chunks = list(iter_cvae_augmentation(input_df, output_df, num_aug=num_aug, chunk_size=chunk_size, valid_fraction=valid_fraction, log_path=log_path, cache_dir=cache_dir))
+    x_aug_df = pd.concat([x for x, _ in chunks], ignore_index=True)
+    y_aug_df = pd.concat([y for _, y in chunks], ignore_index=True)
 
-    return x_aug_df, y_aug_df
\ No newline at end of file
+    return x_aug_df, y_aug_df
@@ -0,0 +1,707 @@
+# !/usr/bin/env python3
+
+import os, glob, time, pickle, threading, multiprocessing
+import numpy as np
+from ase import units
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+from masgent.utils.utils import write_vasp_file
+
+# Memory budget (MB) for the process-wide calculator pool, can be overridden with MASGENT_MLPS_POOL_MEMORY_MB
+MLPS_POOL_MEMORY_MB = float(os.environ.get('MASGENT_MLPS_POOL_MEMORY_MB', 4096))
+
+# Fallback memory estimate (MB) for calculators whose model size cannot be inspected
+_DEFAULT_CALC_MEMORY_MB = 512.0
+
+# Process-wide calculator pool {(mlps_type, device, precision): (calc, memory_mb)}, ordered from least to most recently used
+_CALC_POOL = OrderedDict()
+_CALC_POOL_STATS = {'hits': 0, 'misses': 0, 'evictions': 0}
+_CALC_POOL_LOCK = threading.Lock()
+
+# One lock per (mlps_type, device, precision), held while a thread loads or runs that calculator
+_CALC_LOCKS = {}
+
+def load_calculator(mlps_type, device=None, precision='float32-high'):
+    '''
+    Build a fresh ASE calculator for the given MLPs type, device = None keeps the default device of each MLP.
+    '''
+    if mlps_type == 'SevenNet':
+        from sevenn.calculator import SevenNetCalculator
+        if device is None:
+            return SevenNetCalculator(model='7net-0')
+        return SevenNetCalculator(model='7net-0', device=device)
+    elif mlps_type == 'CHGNet':
+        from chgnet.model.dynamics import CHGNetCalculator
+        return CHGNetCalculator(use_device=device)
+    elif mlps_type == 'Orb-v3':
+        from orb_models.forcefield import pretrained
+        from orb_models.forcefield.calculator import ORBCalculator
+        device = device or 'cpu'
+        orbff = pretrained.orb_v3_conservative_inf_omat(
+            device=device,
+            precision=precision,   # "float32-high" / "float32-highest" / "float64"
+            )
+        return ORBCalculator(orbff, device=device)
+    elif mlps_type == 'MatSim':
+        from mattersim.forcefield import MatterSimCalculator
+        if device is None:
+            return MatterSimCalculator()
+        return MatterSimCalculator(device=device)
+    else:
+        raise ValueError(f'Invalid MLPs type: {mlps_type}.')
+
+def _estimate_calculator_memory(calc):
+    '''
+    Estimate the memory (MB) held by the torch model(s) of a calculator.
+    '''
+    seen, total = set(), 0
+    candidates = list(vars(calc).values())
+    # MatterSim keeps the torch model one level deeper (calc.potential.model)
+    candidates += [getattr(v, 'model', None) for v in candidates if not hasattr(v, 'parameters')]
+    for value in candidates:
+        if value is None or not hasattr(value, 'parameters') or id(value) in seen:
+            continue
+        seen.add(id(value))
+        try:
+            total += sum(p.numel() * p.element_size() for p in value.parameters())
+            total += sum(b.numel() * b.element_size() for b in value.buffers())
+        except Exception:
+            continue
+    return total / 1024**2 if total > 0 else _DEFAULT_CALC_MEMORY_MB
+
+def _evict_calculators(budget_mb, keep=None):
+    '''
+    Evict least recently used calculators until the pool fits in the memory budget, caller must hold the lock.
+    '''
+    while sum(mem for _, mem in _CALC_POOL.values()) > budget_mb:
+        # Never evict the calculator that was just requested, even if it alone exceeds the budget
+        victims = [key for key in _CALC_POOL if key != keep]
+        if not victims:
+            break
+        del _CALC_POOL[victims[0]]
+        _CALC_POOL_STATS['evictions'] += 1
+
+def get_calculator(mlps_type, device=None, precision='float32-high'):
+    '''
+    Get a warm calculator from the process-wide pool, loading it on a miss.
+
+    Pooled calculators are shared by all threads and ASE calculators are not thread-safe,
+    code that may run on several threads should hold the calculator through use_calculator instead.
+    '''
+    key = (mlps_type, device, precision)
+    with _CALC_POOL_LOCK:
+        if key in _CALC_POOL:
+            _CALC_POOL.move_to_end(key)
+            _CALC_POOL_STATS['hits'] += 1
+            calc = _CALC_POOL[key][0]
+            # Drop cached results of the previous structure
+            calc.reset()
+            return calc
+        _CALC_POOL_STATS['misses'] += 1
+
+    # Load outside the lock, weights loading can take several seconds
+    calc = load_calculator(mlps_type, device=device, precision=precision)
+    memory_mb = _estimate_calculator_memory(calc)
+
+    with _CALC_POOL_LOCK:
+        _CALC_POOL[key] = (calc, memory_mb)
+        _CALC_POOL.move_to_end(key)
+        _evict_calculators(MLPS_POOL_MEMORY_MB, keep=key)
+    return calc
+
+@contextmanager
+def use_calculator(mlps_type, device=None, precision='float32-high'):
+    '''
+    Check out the pooled calculator for the duration of the with block.
+    Other threads asking for the same calculator wait until it is checked back in.
+    '''
+    key = (mlps_type, device, precision)
+    with _CALC_POOL_LOCK:
+        lock = _CALC_LOCKS.setdefault(key, threading.Lock())
+    with lock:
+        yield get_calculator(mlps_type, device=device, precision=precision)
+
+def set_calculator_pool_budget(memory_mb):
+    '''
+    Set the memory budget (MB) of the calculator pool and evict calculators if needed.
+    '''
+    global MLPS_POOL_MEMORY_MB
+    if memory_mb <= 0:
+        raise ValueError('Calculator pool memory budget must be a positive number.')
+    with _CALC_POOL_LOCK:
+        MLPS_POOL_MEMORY_MB = float(memory_mb)
+        _evict_calculators(MLPS_POOL_MEMORY_MB)
+
+def clear_calculator_pool():
+    '''
+    Release all pooled calculators and reset the statistics.
+    '''
+    with _CALC_POOL_LOCK:
+        _CALC_POOL.clear()
+        for k in _CALC_POOL_STATS:
+            _CALC_POOL_STATS[k] = 0
+
+def calculator_pool_stats():
+    '''
+    Report hit/miss/eviction counts and the calculators currently kept warm.
+    '''
+    with _CALC_POOL_LOCK:
+        return {
+            **_CALC_POOL_STATS,
+            'loaded': [f'{k[0]} (device={k[1] or "default"}, precision={k[2]})' for k in _CALC_POOL],
+            'memory_mb': round(sum(mem for _, mem in _CALC_POOL.values()), 1),
+            'memory_budget_mb': MLPS_POOL_MEMORY_MB,
+        }
+
+def _init_mlps_worker(mlps_type, device, precision, n_threads):
+    '''
+    Initialize a pool worker: split the CPU threads between workers and warm up its calculator.
+    '''
+    try:
+        import torch
+        torch.set_num_threads(n_threads)
+    except ImportError:
+        pass
+    get_calculator(mlps_type, device=device, precision=precision)
+
+def run_in_pool(func, tasks, n_workers, mlps_type, device=None, precision='float32-high'):
+    '''
+    Run func(*task) for every task and return the results in order.
+    With n_workers > 1 the tasks are spread across a process pool holding one warm calculator per worker.
+    '''
+    if n_workers <= 1 or len(tasks) <= 1:
+        return [func(*task) for task in tasks]
+
+    n_workers = min(n_workers, len(tasks))
+    n_threads = max(1, (os.cpu_count() or 1) // n_workers)
+    # Use spawn since forking a process with an initialized torch runtime is unsafe
+    with ProcessPoolExecutor(
+        max_workers=n_workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_mlps_worker,
+        initargs=(mlps_type, device, precision, n_threads),
+    ) as pool:
+        futures = [pool.submit(func, *task) for task in tasks]
+        return [future.result() for future in futures]
+
+def relax_eos_point(structure, scale, mlps_type, device, precision, fmax, max_steps, task_dir):
+    '''
+    Relax one EOS scale point at fixed cell and return its volume, energy per atom and wall-clock time.
+    '''
+    from ase.optimize import LBFGS
+
+    start = time.perf_counter()
+
+    # Create scaled structure
+    scaled_structure = structure.copy()
+    scaled_structure.scale_lattice(structure.volume * scale)
+    scaled_structure_path = os.path.join(task_dir, f'POSCAR_{scale:.3f}')
+    comments = f'# Generated by Masgent for EOS calculation with scale factor = {scale:.3f} using {mlps_type}.'
+    write_vasp_file(scaled_structure.to(fmt='poscar'), scaled_structure_path, 'poscar', comments)
+
+    # Perform optimization on the scaled structure
+    atoms = scaled_structure.to_ase_atoms()
+    with use_calculator(mlps_type, device=device, precision=precision) as calc:
+        atoms.calc = calc
+        opt = LBFGS(atoms, logfile=f'{task_dir}/masgent_mlps_eos_{scale:.3f}.log')
+        opt.run(fmax=fmax, steps=max_steps)
+        energy = atoms.get_potential_energy()
+    comments = f'# Generated by Masgent from simulation using {mlps_type} with fmax = {fmax} eV/Å.'
+    write_vasp_file(atoms, f'{task_dir}/CONTCAR_{scale:.3f}', 'poscar', comments, direct=True, sort=True)
+
+    return {
+        'volume': atoms.get_volume(),
+        'energy': energy / len(atoms),
+        'wall_time': time.perf_counter() - start,
+    }
+
+def relax_strain_state(atoms, folder_name, mlps_type, device, precision, fmax, max_steps, task_dir):
+    '''
+    Relax one deformed structure for elastic constants and return its stress (GPa, Voigt) and wall-clock time.
+    '''
+    from ase.filters import FrechetCellFilter
+    from ase.optimize import LBFGS
+
+    start = time.perf_counter()
+
+    with use_calculator(mlps_type, device=device, precision=precision) as calc:
+        atoms.calc = calc
+        opt = LBFGS(FrechetCellFilter(atoms), logfile=f'{task_dir}/masgent_mlps_elastic_{folder_name}.log')
+        opt.run(fmax=fmax, steps=max_steps)
+        stress = atoms.get_stress(voigt=True)  # in eV/Å³
+    comments = f'# Generated by Masgent from simulation using {mlps_type} with fmax = {fmax} eV/Å.'
+    write_vasp_file(atoms, f'{task_dir}/CONTCAR_{folder_name}', 'poscar', comments, direct=True, sort=True)
+
+    return {
+        'stress': (stress * 160.21766208).tolist(),  # convert to GPa
+        'wall_time': time.perf_counter() - start,
+    }
+
+def collect_structure_files(structures_path):
+    '''
+    Collect structure files from a directory or a glob pattern.
+    '''
+    if os.path.isdir(structures_path):
+        files = glob.glob(os.path.join(structures_path, '*'))
+    else:
+        files = glob.glob(structures_path)
+    return sorted(f for f in files if os.path.isfile(f))
+
+def structure_names(structure_files):
+    '''
+    Name each structure file by its path relative to the common root of all files.
+    Files matched by a pattern such as '*/POSCAR' share a basename, so the basename alone is not unique.
+    '''
+    if not structure_files:
+        return {}
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(file)) for file in structure_files])
+    return {file: os.path.relpath(os.path.abspath(file), root) for file in structure_files}
+
+def _predict_batch(atoms_list, mlps_type, device, precision, batch_size):
+    '''
+    Predict energies (eV), forces (eV/Å) and stresses (GPa, Voigt) for a list of structures.
+    Only CHGNet evaluates the list as batched graphs, so batch_size only sets its inference batch size.
+    SevenNet, Orb-v3 and MatterSim run through the warm calculator one structure per forward pass.
+    '''
+    with use_calculator(mlps_type, device=device, precision=precision) as calc:
+        if mlps_type == 'CHGNet':
+            from pymatgen.io.ase import AseAtomsAdaptor
+            structures = [AseAtomsAdaptor.get_structure(atoms) for atoms in atoms_list]
+            preds = calc.model.predict_structure(structures, task='efs', batch_size=batch_size)
+            if isinstance(preds, dict):
+                preds = [preds]
+            # CHGNet predicts energy per atom and the full 3x3 stress tensor in GPa
+            from ase.stress import full_3x3_to_voigt_6_stress
+            results = []
+            for atoms, pred in zip(atoms_list, preds):
+                stress = np.asarray(pred['s'])
+                if stress.shape == (3, 3):
+                    stress = full_3x3_to_voigt_6_stress(stress)
+                results.append((float(pred['e']) * len(atoms), np.asarray(pred['f']), stress))
+            return results
+
+        results = []
+        for atoms in atoms_list:
+            atoms.calc = calc
+            energy = atoms.get_potential_energy()
+            forces = atoms.get_forces()
+            stress = atoms.get_stress(voigt=True) * 160.21766208  # convert to GPa
+            results.append((energy, forces, stress))
+        return results
+
+def run_batch_screening(structure_files, mlps_type, device, precision, batch_size, task_dir):
+    '''
+    Single-point screening of many structures, writing one consolidated CSV of energies, forces and stresses.
+    '''
+    from ase.io import read
+
+    screening_csv = os.path.join(task_dir, 'batch_screening.csv')
+    forces_csv = os.path.join(task_dir, 'batch_forces.csv')
+    with open(screening_csv, 'w') as f:
+        f.write('Structure,Formula,Atoms,Energy (eV),Energy (eV/atom),Max Force (eV/Å),Stress xx (GPa),Stress yy (GPa),Stress zz (GPa),Stress yz (GPa),Stress xz (GPa),Stress xy (GPa)\n')
+    with open(forces_csv, 'w') as f:
+        f.write('Structure,Atom Index,Element,Fx (eV/Å),Fy (eV/Å),Fz (eV/Å)\n')
+
+    file_names = structure_names(structure_files)
+    screened, failed = [], []
+    for i in range(0, len(structure_files), batch_size):
+        # Read one batch at a time to keep memory bounded
+        names, atoms_list = [], []
+        for file in structure_files[i:i + batch_size]:
+            try:
+                atoms_list.append(read(file))
+                names.append(file_names[file])
+            except Exception:
+                failed.append(file)
+        if not atoms_list:
+            continue
+
+        results = _predict_batch(atoms_list, mlps_type, device, precision, batch_size)
+
+        with open(screening_csv, 'a') as f_screening, open(forces_csv, 'a') as f_forces:
+            for name, atoms, (energy, forces, stress) in zip(names, atoms_list, results):
+                energy_per_atom = energy / len(atoms)
+                max_force = np.linalg.norm(forces, axis=1).max()
+                f_screening.write(f'{name},{atoms.get_chemical_formula()},{len(atoms)},{energy:.8f},{energy_per_atom:.8f},{max_force:.8f},' + ','.join(f'{val:.8f}' for val in stress) + '\n')
+                for j, (symbol, force) in enumerate(zip(atoms.get_chemical_symbols(), forces)):
+                    f_forces.write(f'{name},{j},{symbol},{force[0]:.8f},{force[1]:.8f},{force[2]:.8f}\n')
+                screened.append((name, energy_per_atom))
+
+    return {
+        'screening_csv': screening_csv,
+        'forces_csv': forces_csv,
+        'screened': screened,
+        'failed': failed,
+    }
+
+class MDStreamWriter:
+    '''
+    Streaming sink for MD runs, attached to an ASE dynamics object.
+    Frames are written in compressed chunks and the observables (energies, temperature, MSD, RDF)
+    are accumulated as frames arrive, so memory stays flat regardless of the run length.
+    '''
+    def __init__(self, dyn, atoms, task_dir, write_frames=False, chunk_size=100, rdf_rmax=6.0, rdf_nbins=120, rdf_interval=10, buffer_size=2000, state=None):
+        self.dyn = dyn
+        self.atoms = atoms
+        self.task_dir = task_dir
+        self.write_frames = write_frames
+        self.chunk_size = chunk_size
+        self.rdf_interval = rdf_interval
+        self.buffer_size = buffer_size
+        self.n_atoms = len(atoms)
+
+        # Observables streamed to CSV, one line per frame
+        self.observables_path = os.path.join(task_dir, 'md_observables.csv')
+        self._observables_file = None
+
+        # Chunked compressed frames
+        self.frames_dir = os.path.join(task_dir, 'md_frames')
+        if write_frames:
+            os.makedirs(self.frames_dir, exist_ok=True)
+        self._chunk = {'step': [], 'positions': [], 'momenta': [], 'cell': []}
+        self.n_chunks = 0
+
+        # Unwrapped displacements for MSD
+        self._prev_scaled = atoms.get_scaled_positions(wrap=False)
+        self._displacement = np.zeros((self.n_atoms, 3))
+
+        # RDF histogram accumulated over frames
+        self.rdf_edges = np.linspace(0.0, rdf_rmax, rdf_nbins + 1)
+        self._rdf_hist = np.zeros(rdf_nbins)
+        self._rdf_frames = 0
+        self._rdf_density = 0.0
+
+        # Running sums for the averages
+        self.n_frames = 0
+        self._sums = np.zeros(4)  # Etot/N, Epot/N, Ekin/N, T
+
+        # Decimated buffer for plotting: the stride doubles every time the buffer fills up
+        self._buffer = []
+        self._stride = 1
+
+        if state is not None:
+            self.load_state_dict(state)
+        else:
+            self._observables_file = open(self.observables_path, 'w')
+            self._observables_file.write('Step,Time[ps],Etot/N[eV],Epot/N[eV],Ekin/N[eV],T[K],MSD[Å²]\n')
+            # Remove stale chunks of a previous run
+            for file in glob.glob(os.path.join(self.frames_dir, 'frames_*.npz')):
+                os.remove(file)
+
+    def state_dict(self):
+        '''
+        Flush everything written so far and return the state needed to resume the stream.
+        '''
+        if self.write_frames:
+            self._flush_chunk()
+        self._observables_file.flush()
+        return {
+            'observables_offset': self._observables_file.tell(),
+            'n_chunks': self.n_chunks,
+            'prev_scaled': self._prev_scaled.copy(),
+            'displacement': self._displacement.copy(),
+            'rdf_hist': self._rdf_hist.copy(),
+            'rdf_frames': self._rdf_frames,
+            'rdf_density': self._rdf_density,
+            'n_frames': self.n_frames,
+            'sums': self._sums.copy(),
+            'buffer': list(self._buffer),
+            'stride': self._stride,
+        }
+
+    def load_state_dict(self, state):
+        '''
+        Resume the stream from a checkpoint, dropping anything written after it.
+        '''
+        with open(self.observables_path, 'r+b') as f:
+            f.truncate(state['observables_offset'])
+        self._observables_file = open(self.observables_path, 'a')
+
+        self.n_chunks = state['n_chunks']
+        for file in glob.glob(os.path.join(self.frames_dir, 'frames_*.npz')):
+            if int(os.path.basename(file)[7:12]) >= self.n_chunks:
+                os.remove(file)
+
+        self._prev_scaled = state['prev_scaled']
+        self._displacement = state['displacement']
+        self._rdf_hist = state['rdf_hist']
+        self._rdf_frames = state['rdf_frames']
+        self._rdf_density = state['rdf_density']
+        self.n_frames = state['n_frames']
+        self._sums = state['sums']
+        self._buffer = state['buffer']
+        self._stride = state['stride']
+
+    def __call__(self):
+        atoms = self.atoms
+        step = self.dyn.nsteps
+        time_ps = self.dyn.get_time() / (1000 * units.fs)
+        epot = atoms.get_potential_energy() / self.n_atoms
+        ekin = atoms.get_kinetic_energy() / self.n_atoms
+        temperature = atoms.get_temperature()
+
+        # Minimum-image displacement since the previous frame, accumulated into unwrapped displacements
+        scaled = atoms.get_scaled_positions(wrap=False)
+        d_scaled = scaled - self._prev_scaled
+        d_scaled -= np.round(d_scaled) * atoms.pbc
+        self._displacement += d_scaled @ atoms.cell.array
+        self._prev_scaled = scaled
+        msd = np.mean(np.sum(self._displacement**2, axis=1))
+
+        row = [step, time_ps, epot + ekin, epot, ekin, temperature, msd]
+        self._observables_file.write(f'{step},{time_ps:.6f},{epot + ekin:.8f},{epot:.8f},{ekin:.8f},{temperature:.4f},{msd:.8f}\n')
+        self._sums += row[2:6]
+
+        if self.n_frames % self._stride == 0:
+            self._buffer.append(row)
+            if len(self._buffer) >= self.buffer_size:
+                self._buffer = self._buffer[::2]
+                self._stride *= 2
+
+        if self.n_frames % self.rdf_interval == 0:
+            self._accumulate_rdf()
+
+        if self.write_frames:
+            self._chunk['step'].append(step)
+            self._chunk['positions'].append(atoms.get_positions().astype(np.float32))
+            self._chunk['momenta'].append(atoms.get_momenta().astype(np.float32))
+            self._chunk['cell'].append(atoms.cell.array.astype(np.float32))
+            if len(self._chunk['step']) >= self.chunk_size:
+                self._flush_chunk()
+
+        self.n_frames += 1
+
+    def _accumulate_rdf(self):
+        from ase.neighborlist import neighbor_list
+        distances = neighbor_list('d', self.atoms, self.rdf_edges[-1])
+        hist, _ = np.histogram(distances, bins=self.rdf_edges)
+        self._rdf_hist += hist
+        self._rdf_frames += 1
+        self._rdf_density += self.n_atoms / self.atoms.get_volume()
+
+    def _flush_chunk(self):
+        if not self._chunk['step']:
+            return
+        np.savez_compressed(
+            os.path.join(self.frames_dir, f'frames_{self.n_chunks:05d}.npz'),
+            numbers=self.atoms.numbers,
+            pbc=self.atoms.pbc,
+            **{k: np.array(v) for k, v in self._chunk.items()},
+        )
+        self.n_chunks += 1
+        for v in self._chunk.values():
+            v.clear()
+        self._observables_file.flush()
+
+    def rdf(self):
+        '''
+        Radial distribution function g(r) averaged over the sampled frames.
+        '''
+        r = 0.5 * (self.rdf_edges[1:] + self.rdf_edges[:-1])
+        if self._rdf_frames == 0:
+            return r, np.zeros_like(r)
+        shell_volumes = 4.0 / 3.0 * np.pi * (self.rdf_edges[1:]**3 - self.rdf_edges[:-1]**3)
+        density = self._rdf_density / self._rdf_frames
+        g = self._rdf_hist / (self._rdf_frames * self.n_atoms * density * shell_volumes)
+        return r, g
+
+    def averages(self):
+        '''
+        Running averages of the per-atom energies and temperature.
+        '''
+        means = self._sums / max(self.n_frames, 1)
+        return {
+            'Etot/N[eV]': float(means[0]),
+            'Epot/N[eV]': float(means[1]),
+            'Ekin/N[eV]': float(means[2]),
+            'T[K]': float(means[3]),
+        }
+
+    def diffusion_coefficient(self):
+        '''
+        Diffusion coefficient (cm²/s) from the Einstein relation, fitted on the second half of the MSD to skip the ballistic regime.
+        '''
+        data = np.array(self._buffer)
+        data = data[len(data) // 2:]
+        if len(data) < 2 or np.ptp(data[:, 1]) == 0:
+            return 0.0
+        slope = np.polyfit(data[:, 1], data[:, 6], 1)[0]  # Å²/ps
+        return float(slope / 6 * 1e-4)
+
+    def close(self):
+        '''
+        Flush the last chunk and write the RDF.
+        '''
+        if self.write_frames:
+            self._flush_chunk()
+        self._observables_file.close()
+        r, g = self.rdf()
+        with open(os.path.join(self.task_dir, 'md_rdf.csv'), 'w') as f:
+            f.write('r[Å],g(r)\n')
+            for r_i, g_i in zip(r, g):
+                f.write(f'{r_i:.4f},{g_i:.8f}\n')
+
+    def plot(self, mlps_type):
+        '''
+        Plot energies and temperature from the decimated buffer.
+        '''
+        import matplotlib
+        matplotlib.use('Agg')  # Use non-interactive backend for plotting
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
+        data = np.array(self._buffer)
+        sns.set_theme(font_scale=1.2, style='whitegrid')
+        matplotlib.rcParams['xtick.direction'] = 'in'
+        matplotlib.rcParams['ytick.direction'] = 'in'
+        fig, ax = plt.subplots(4, 1, figsize=(8, 6), sharex=True, sharey=False, constrained_layout=True)
+        ax[0].plot(data[:, 1], data[:, 2], color='C0')
+        ax[1].plot(data[:, 1], data[:, 3], color='C1')
+        ax[2].plot(data[:, 1], data[:, 4], color='C2')
+        ax[3].plot(data[:, 1], data[:, 5], label='T', color='C3')
+        ax[0].set_ylabel('$E_{tot}$ (eV/atom)')
+        ax[1].set_ylabel('$E_{pot}$ (eV/atom)')
+        ax[2].set_ylabel('$E_{kin}$ (eV/atom)')
+        ax[3].set_ylabel('$T$ (K)')
+        ax[3].set_xlabel('Time (ps)')
+        ax[0].set_title(f'Masgent MD using {mlps_type}')
+        plt.savefig(f'{self.task_dir}/md_log.png', dpi=330)
+        plt.close(fig)
+
+def _truncate_trajectory(traj_path, n_frames):
+    '''
+    Drop trajectory frames written after the last checkpoint.
+    '''
+    from ase.io.trajectory import Trajectory
+
+    if not os.path.isfile(traj_path):
+        return
+    with Trajectory(traj_path) as traj:
+        if len(traj) <= n_frames:
+            return
+        with Trajectory(f'{traj_path}.tmp', 'w') as new_traj:
+            for i in range(n_frames):
+                new_traj.write(traj[i])
+    os.replace(f'{traj_path}.tmp', traj_path)
+
+def save_md_checkpoint(checkpoint_path, dyn, atoms, writer, log_path):
+    '''
+    Save positions, momenta, thermostat chain state, step counter and stream state, atomically via temp file plus rename.
+    '''
+    state = {
+        'step': dyn.nsteps,
+        'cell': atoms.cell.array.copy(),
+        'positions': atoms.get_positions(),
+        'momenta': atoms.get_momenta(),
+        'eta': dyn._thermostat._eta.copy(),
+        'p_eta': dyn._thermostat._p_eta.copy(),
+        'writer': writer.state_dict(),
+        'log_offset': os.path.getsize(log_path) if os.path.isfile(log_path) else 0,
+    }
+    with open(f'{checkpoint_path}.tmp', 'wb') as f:
+        pickle.dump(state, f)
+    os.replace(f'{checkpoint_path}.tmp', checkpoint_path)
+
+def run_md(atoms, calc, task_dir, mlps_type, temperature, md_steps, md_timestep, frame_format='traj', loginterval=10, checkpoint_interval=1000, resume=False):
+    '''
+    Run NVT molecular dynamics with a Nose-Hoover chain thermostat and stream the frames and observables to task_dir.
+    A checkpoint is saved every checkpoint_interval steps, resume = True continues from the latest checkpoint in task_dir.
+    '''
+    from ase.md.velocitydistribution import MaxwellBoltzmannDistribution, Stationary
+    from ase.md.nose_hoover_chain import NoseHooverChainNVT
+    from ase.md import MDLogger
+
+    traj_path = f'{task_dir}/masgent_mlps_md.traj'
+    log_path = f'{task_dir}/masgent_mlps_md.log'
+    checkpoint_path = f'{task_dir}/md_checkpoint.pkl'
+
+    state = None
+    if resume and os.path.isfile(checkpoint_path):
+        with open(checkpoint_path, 'rb') as f:
+            state = pickle.load(f)
+
+    atoms.calc = calc
+    if state is None:
+        MaxwellBoltzmannDistribution(atoms, temperature_K=temperature)
+        Stationary(atoms)
+    else:
+        # Restore the checkpoint and drop everything written after it
+        atoms.set_cell(state['cell'])
+        atoms.set_positions(state['positions'])
+        atoms.set_momenta(state['momenta'])
+        with open(log_path, 'r+b') as f:
+            f.truncate(state['log_offset'])
+        if frame_format == 'traj':
+            _truncate_trajectory(traj_path, state['writer']['n_frames'])
+
+    dyn = NoseHooverChainNVT(
+        atoms=atoms,
+        timestep=md_timestep * units.fs,
+        temperature_K=temperature,
+        tdamp=100 * md_timestep * units.fs,
+        trajectory=traj_path if frame_format == 'traj' else None,
+        loginterval=loginterval,
+        append_trajectory=state is not None,
+    )
+    if state is not None:
+        dyn.nsteps = state['step']
+        dyn._thermostat._eta[:] = state['eta']
+        dyn._thermostat._p_eta[:] = state['p_eta']
+
+    dyn.attach(MDLogger(
+        dyn=dyn,
+        atoms=atoms,
+        logfile=log_path,
+        header=state is None,
+        peratom=True,
+        mode='w' if state is None else 'a',
+    ), interval=loginterval)
+    writer = MDStreamWriter(dyn, atoms, task_dir, write_frames=(frame_format == 'npz'), state=None if state is None else state['writer'])
+    dyn.attach(writer, interval=loginterval)
+    # Attached last so that every frame of the checkpoint step is already written
+    dyn.attach(lambda: save_md_checkpoint(checkpoint_path, dyn, atoms, writer, log_path), interval=checkpoint_interval)
+
+    try:
+        dyn.run(max(md_steps - dyn.nsteps, 0))
+        save_md_checkpoint(checkpoint_path, dyn, atoms, writer, log_path)
+    finally:
+        writer.close()
+    writer.plot(mlps_type)
+
+    return {
+        'md_trajectory_path': traj_path if frame_format == 'traj' else writer.frames_dir,
+        'md_log_path': log_path,
+        'md_observables_csv_path': writer.observables_path,
+        'md_rdf_csv_path': os.path.join(task_dir, 'md_rdf.csv'),
+        'md_log_png_path': f'{task_dir}/md_log.png',
+        'md_checkpoint_path': checkpoint_path,
+        'resumed_from_step': 0 if state is None else state['step'],
+        'averages': writer.averages(),
+        'diffusion_coefficient': writer.diffusion_coefficient(),
+    }
+
+def run_md_replica(poscar_path, temperature, mlps_type, device, precision, md_steps, md_timestep, frame_format, task_dir):
+    '''
+    Run one NVT replica of a temperature sweep in its own sub-directory.
+    '''
+    from ase.io import read
+
+    replica_dir = os.path.join(task_dir, f'T_{temperature}K')
+    os.makedirs(replica_dir, exist_ok=True)
+    atoms = read(poscar_path, format='vasp')
+    start = time.perf_counter()
+    with use_calculator(mlps_type, device=device, precision=precision) as calc:
+        result = run_md(
+            atoms=atoms,
+            calc=calc,
+            task_dir=replica_dir,
+            mlps_type=mlps_type,
+            temperature=temperature,
+            md_steps=md_steps,
+            md_timestep=md_timestep,
+            frame_format=frame_format,
+        )
+    result['wall_time'] = time.perf_counter() - start
+    return result
@@ -6,6 +6,7 @@ import torch
 import optuna
 import shutil
 import joblib
+import multiprocessing as mp
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -15,6 +16,7 @@ from tqdm import tqdm
 from copy import copy
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import KFold
+from concurrent.futures import ProcessPoolExecutor
 
 
 def get_std(data, scaler):
@@ -22,18 +24,45 @@ def get_std(data, scaler):
     return data_std
 
 
-def get_scaler(data_scaler):
-    data = pd.read_csv(data_scaler)
+def get_scaler(data):
     scaler = StandardScaler()
-    scaler.fit(data.to_numpy())
+    scaler.fit(data)
     return scaler
 
 
+def prepare_data(input_data, output_data, data_path):
+    '''
+    Read and scale the datasets once for the whole study and save them to data_path (.npz),
+    so that every trial, fold and worker process can load them without parsing the CSV files.
+    '''
+    x = pd.read_csv(input_data).to_numpy()
+    y = pd.read_csv(output_data).to_numpy()
+    x_std = get_std(x, get_scaler(x))
+    y_std = get_std(y, get_scaler(y))
+    np.savez(data_path, x_std=x_std, y_std=y_std)
+
+
+def load_data(data_path):
+    '''
+    Load the scaled data and build the K-Fold tensors on DEVICE, once per process.
+    '''
+    global N_INPUTS, N_OUTPUTS, FOLD_DATA
+    data = np.load(data_path)
+    x_std, y_std = data['x_std'], data['y_std']
+    N_INPUTS, N_OUTPUTS = x_std.shape[1], y_std.shape[1]
+
+    FOLD_DATA = []
+    for train_index, valid_index in KFold(n_splits=5, shuffle=True, random_state=0).split(x_std):
+        train_x, train_y = torch.FloatTensor(x_std[train_index]).to(DEVICE), torch.FloatTensor(y_std[train_index]).to(DEVICE)
+        valid_x, valid_y = torch.FloatTensor(x_std[valid_index]).to(DEVICE), torch.FloatTensor(y_std[valid_index]).to(DEVICE)
+        FOLD_DATA.append((train_x, train_y, valid_x, valid_y))
+
+
 def define_model(trial):
     n_layers = trial.suggest_int('n_layers', LAYERS_MIN, LAYERS_MAX, step=LAYERS_STEP)
     layers = []
-    input_features = pd.read_csv(INPUT_DATA).shape[1]
-    output_features = pd.read_csv(OUTPUT_DATA).shape[1]
+    input_features = N_INPUTS
+    output_features = N_OUTPUTS
     in_features = copy(input_features)
 
     for i in range(n_layers):
@@ -48,22 +77,13 @@ def define_model(trial):
 
 
 def objective(trial):
-    # Get the training and validation data
-    x_scaler = get_scaler(data_scaler=INPUT_DATA)
-    y_scaler = get_scaler(data_scaler=OUTPUT_DATA)
-    
-    # Perform K-Fold cross validation
-    input_data = pd.read_csv(INPUT_DATA)
-    output_data = pd.read_csv(OUTPUT_DATA)
-    x = input_data.to_numpy()
-    y = output_data.to_numpy()
-    x_std = get_std(x, x_scaler)
-    y_std = get_std(y, y_scaler)
-
-    # Training with K-Fold cross validation
-    loss_train_data, loss_valid_data = [], []
+    # Training with K-Fold cross validation, the fold tensors are shared by all trials
+    # Loss history stays on the device until the end of the trial, NaN marks epochs without a value
+    loss_train_data = torch.full((len(FOLD_DATA), MAX_EPOCHS), float('nan'), device=DEVICE)
+    loss_valid_data = torch.full((len(FOLD_DATA), MAX_EPOCHS), float('nan'), device=DEVICE)
     loss_train_fold, loss_valid_fold = [], []
-    for fold, (train_index, valid_index) in enumerate(KFold(n_splits=5, shuffle=True, random_state=0).split(x_std)):
+    epochs_trained = 0
+    for fold, (train_x, train_y, valid_x, valid_y) in enumerate(FOLD_DATA):
         # Define the model
         torch.manual_seed(0)
         model = define_model(trial).to(DEVICE)
@@ -73,15 +93,6 @@ def objective(trial):
         optimizer = getattr(torch.optim, optimizer_name)(model.parameters(), lr=lr, weight_decay=wd)
         loss_func = torch.nn.MSELoss()
 
-        # Split the data into training and validation sets
-        x_train, x_valid = x_std[train_index], x_std[valid_index]
-        y_train, y_valid = y_std[train_index], y_std[valid_index]
-        data_train, data_valid = [x_train, y_train], [x_valid, y_valid]
-
-        # Transfer the data as torch tensors
-        train_x, train_y = torch.FloatTensor(data_train[0]).to(DEVICE), torch.FloatTensor(data_train[1]).to(DEVICE)
-        valid_x, valid_y = torch.FloatTensor(data_valid[0]).to(DEVICE), torch.FloatTensor(data_valid[1]).to(DEVICE)
-
         # Dynamically change the number of epochs based on the NN complexity
         layers = (model.__len__() - 1) // 3
         epochs = 100 + 10 * layers
@@ -91,13 +102,27 @@ def objective(trial):
         for epoch in tqdm(range(epochs), desc=f'Trial {trial.number} Fold {fold+1}', position=0, leave=False):
             optimizer.zero_grad()
             output_train = model(train_x)
-            output_valid = model(valid_x)
             loss_train = loss_func(output_train, train_y)
-            loss_valid = loss_func(output_valid, valid_y)
-            loss_train_data.append([fold, epoch, loss_train.item()])
-            loss_valid_data.append([fold, epoch, loss_valid.item()])
             loss_train.backward()
             optimizer.step()
+            loss_train_data[fold, epoch] = loss_train.detach()
+
+            # Validate every VALID_INTERVAL epochs without autograd and without dropout
+            if (epoch + 1) % VALID_INTERVAL != 0:
+                continue
+            model.eval()
+            with torch.no_grad():
+                loss_valid = loss_func(model(valid_x), valid_y)
+            model.train()
+            loss_valid_data[fold, epoch] = loss_valid
+
+            # Report at a (fold, epoch) step shared by all trials, so the pruner can stop hopeless trials early
+            trial.report(loss_valid.item(), fold * MAX_EPOCHS + epoch)
+            if trial.should_prune():
+                trial.set_user_attr('epochs_trained', epochs_trained + epoch + 1)
+                trial.set_user_attr('epochs_budget', len(FOLD_DATA) * epochs)
+                raise optuna.exceptions.TrialPruned()
+        epochs_trained += epochs
 
         # Validation
         with torch.no_grad():
@@ -118,17 +143,18 @@ def objective(trial):
     # Define the accuracy
     accuracy = loss_valid_avg
 
+    # Compare with the best trial in the shared storage, so parallel workers agree on new bests
     global CURRENT_ACCURACY, FOUND_NEW
-    if accuracy < CURRENT_ACCURACY:
-        CURRENT_ACCURACY = accuracy
-        FOUND_NEW = True
-    else:
-        FOUND_NEW = False
+    try:
+        CURRENT_ACCURACY = trial.study.best_value
+    except ValueError:
+        CURRENT_ACCURACY = 1e10
+    FOUND_NEW = accuracy < CURRENT_ACCURACY
 
     # Plot the loss curve
     if FOUND_NEW:
-        loss_train_data = np.array(loss_train_data)
-        loss_valid_data = np.array(loss_valid_data)
+        loss_train_data = loss_train_data.cpu().numpy()
+        loss_valid_data = loss_valid_data.cpu().numpy()
         sns.set_theme(font_scale=1.2, style='whitegrid')
         matplotlib.rcParams['xtick.direction'] = 'in'
         matplotlib.rcParams['ytick.direction'] = 'in'
@@ -137,10 +163,10 @@ def objective(trial):
             if fold != 5:
                 # Plot the loss curve for each fold
                 ax = plt.subplot(3, 2, fold+1)
-                fold_train = loss_train_data[loss_train_data[:, 0] == fold]
-                fold_valid = loss_valid_data[loss_valid_data[:, 0] == fold]
-                ax.plot(fold_train[:, 1], fold_train[:, 2], label='Training', color='C0', linewidth=1.5)
-                ax.plot(fold_valid[:, 1], fold_valid[:, 2], label='Validation', color='C1', linewidth=1.5)
+                epochs_train = np.flatnonzero(~np.isnan(loss_train_data[fold]))
+                epochs_valid = np.flatnonzero(~np.isnan(loss_valid_data[fold]))
+                ax.plot(epochs_train, loss_train_data[fold, epochs_train], label='Training', color='C0', linewidth=1.5)
+                ax.plot(epochs_valid, loss_valid_data[fold, epochs_valid], label='Validation', color='C1', linewidth=1.5)
                 ax.text(0.05, 0.95, f'Fold {fold+1}', transform=ax.transAxes, fontweight='bold', va='top', ha='left')
                 ax.set_xlabel('Epoch')
                 ax.set_ylabel('Loss')
@@ -160,19 +186,17 @@ def objective(trial):
         plt.savefig(f'{SAVE_PATH}/best_model_losses/loss_model_{trial.number}.png', dpi=330)
         plt.close()
 
-    # Handle pruning based on the  intermediate value.
-    trial.report(accuracy, epoch)
-    if trial.should_prune():
-        raise optuna.exceptions.TrialPruned()
-    
+    trial.set_user_attr('epochs_trained', epochs_trained)
+    trial.set_user_attr('epochs_budget', epochs_trained)
+
     # Save the model
     torch.save(model, f'{SAVE_PATH}/tested_models/model_{trial.number}.pkl')
 
     return accuracy
 
 
-def optimize(input_data, output_data, n_trials, save_path):
-    global INPUT_DATA, OUTPUT_DATA, N_TRIALS, SAVE_PATH, FOUND_NEW, CURRENT_ACCURACY, LAYERS_MIN, LAYERS_MAX, LAYERS_STEP, NODES_MIN, NODES_MAX, NODES_STEP, OPTIMIZERS, LR_MIN, LR_MAX, WD_MIN, WD_MAX, DROPOUT_MIN, DROPOUT_MAX, DEVICE
+def configure(input_data, output_data, n_trials, save_path, pruner='median', valid_interval=10):
+    global INPUT_DATA, OUTPUT_DATA, N_TRIALS, SAVE_PATH, FOUND_NEW, CURRENT_ACCURACY, LAYERS_MIN, LAYERS_MAX, LAYERS_STEP, NODES_MIN, NODES_MAX, NODES_STEP, OPTIMIZERS, LR_MIN, LR_MAX, WD_MIN, WD_MAX, DROPOUT_MIN, DROPOUT_MAX, DEVICE, PRUNER, VALID_INTERVAL, MAX_EPOCHS
 
     INPUT_DATA = input_data
     OUTPUT_DATA = output_data
@@ -187,6 +211,94 @@ def optimize(input_data, output_data, n_trials, save_path):
     WD_MIN, WD_MAX = 1e-6, 1e-2
     DROPOUT_MIN, DROPOUT_MAX = 0.0, 0.5
     DEVICE = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    PRUNER = pruner
+    VALID_INTERVAL = valid_interval
+    MAX_EPOCHS = 100 + 10 * LAYERS_MAX
+
+
+def get_pruner(pruner):
+    '''
+    Optuna pruner by name, the steps of a trial are its (fold, epoch) positions fold * MAX_EPOCHS + epoch.
+    '''
+    if pruner == 'median':
+        return optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=MAX_EPOCHS // 2)
+    elif pruner == 'hyperband':
+        return optuna.pruners.HyperbandPruner(min_resource=VALID_INTERVAL, max_resource=5 * MAX_EPOCHS, reduction_factor=3)
+    elif pruner == 'successive_halving':
+        return optuna.pruners.SuccessiveHalvingPruner(min_resource=VALID_INTERVAL, reduction_factor=3)
+    else:
+        return optuna.pruners.NopPruner()
+
+
+def pruning_savings(study):
+    '''
+    Epochs actually trained and epochs the finished trials would have trained without pruning.
+    '''
+    trials = study.get_trials(deepcopy=False, states=[optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED])
+    trained = sum(t.user_attrs.get('epochs_trained', 0) for t in trials)
+    budget = sum(t.user_attrs.get('epochs_budget', 0) for t in trials)
+    return trained, budget
+
+
+def get_storage(save_path):
+    '''
+    SQLite storage shared by all worker processes, it also makes the study resumable.
+    Running trials send a heartbeat, so trials of an interrupted run are failed once their heartbeat is stale.
+    '''
+    return optuna.storages.RDBStorage(
+        f'sqlite:///{save_path}/study.db',
+        engine_kwargs={'connect_args': {'timeout': 60}},
+        heartbeat_interval=60,
+        grace_period=180,
+    )
+
+
+def write_progress(study, trial):
+    '''
+    Optuna callback rewriting study_progress.log after every finished trial.
+    '''
+    states = [t.state for t in study.get_trials(deepcopy=False)]
+    complete = states.count(optuna.trial.TrialState.COMPLETE)
+    try:
+        best = f'#{study.best_trial.number} = {study.best_value:.6e}'
+    except ValueError:
+        best = '-'
+    trained, budget = pruning_savings(study)
+
+    tmp_path = f'{SAVE_PATH}/study_progress.log.{os.getpid()}'
+    with open(tmp_path, 'w') as f:
+        f.write(f'Trials requested: {N_TRIALS}\n')
+        f.write(f'Complete trials: {complete}\n')
+        f.write(f'Pruned trials: {states.count(optuna.trial.TrialState.PRUNED)}\n')
+        f.write(f'Failed trials: {states.count(optuna.trial.TrialState.FAIL)}\n')
+        f.write(f'Running trials: {states.count(optuna.trial.TrialState.RUNNING)}\n')
+        f.write(f'Best trial: {best}\n')
+        f.write(f'Epochs trained: {trained} / {budget} ({(1 - trained / max(budget, 1)) * 100:.1f}% saved by pruning)\n')
+    os.replace(tmp_path, f'{SAVE_PATH}/study_progress.log')
+
+
+def run_worker(worker_id, input_data, output_data, n_trials, save_path, pruner, valid_interval, n_threads, n_remaining):
+    '''
+    Run trials of the shared study in one worker process until n_trials are finished in total.
+    '''
+    configure(input_data, output_data, n_trials, save_path, pruner, valid_interval)
+    torch.set_num_threads(n_threads)
+    torch.manual_seed(42 + worker_id)
+    np.random.seed(42 + worker_id)
+    load_data(f'{SAVE_PATH}/design_data.npz')
+
+    study = optuna.load_study(
+        study_name='nn_design',
+        storage=get_storage(SAVE_PATH),
+        sampler=optuna.samplers.TPESampler(seed=42 + worker_id, constant_liar=True),
+        pruner=get_pruner(PRUNER),
+    )
+    finished = (optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED)
+    study.optimize(objective, n_trials=n_remaining, callbacks=[optuna.study.MaxTrialsCallback(N_TRIALS, states=finished), write_progress])
+
+
+def optimize(input_data, output_data, n_trials, save_path, n_workers=1, resume=False, pruner='median', valid_interval=10):
+    configure(input_data, output_data, n_trials, save_path, pruner, valid_interval)
 
     # Create directory for storing results
     if not os.path.exists(SAVE_PATH):
@@ -200,14 +312,36 @@ def optimize(input_data, output_data, n_trials, save_path):
     torch.manual_seed(42)
     np.random.seed(42)
 
-    # Optuna process
-    study = optuna.create_study(direction='minimize', sampler=optuna.samplers.TPESampler(seed=42))
-    study.optimize(objective, n_trials=N_TRIALS, timeout=None)
+    # Load, scale and tensorize the data once for all trials
+    prepare_data(INPUT_DATA, OUTPUT_DATA, f'{SAVE_PATH}/design_data.npz')
+
+    # Optuna process, the study lives in a database file so it can be resumed and shared by workers
+    if not resume and os.path.exists(f'{SAVE_PATH}/study.db'):
+        os.remove(f'{SAVE_PATH}/study.db')
+    study = optuna.create_study(study_name='nn_design', storage=get_storage(SAVE_PATH), direction='minimize', sampler=optuna.samplers.TPESampler(seed=42), pruner=get_pruner(PRUNER), load_if_exists=True)
+
+    # Trials left running by an interrupted run will never finish, fail those whose heartbeat is stale
+    # Optuna also does this before every new trial, which catches trials still within the grace period
+    optuna.storages.fail_stale_trials(study)
+
+    finished = (optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED)
+    n_remaining = N_TRIALS - len(study.get_trials(deepcopy=False, states=finished))
+    if n_remaining > 0 and n_workers > 1:
+        n_threads = max(1, (os.cpu_count() or 1) // n_workers)
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=mp.get_context('spawn')) as executor:
+            futures = [executor.submit(run_worker, i, INPUT_DATA, OUTPUT_DATA, N_TRIALS, SAVE_PATH, PRUNER, VALID_INTERVAL, n_threads, n_remaining) for i in range(n_workers)]
+            for future in futures:
+                future.result()
+    elif n_remaining > 0:
+        load_data(f'{SAVE_PATH}/design_data.npz')
+        study.optimize(objective, n_trials=n_remaining, timeout=None, callbacks=[optuna.study.MaxTrialsCallback(N_TRIALS, states=finished), write_progress])
+    study = optuna.load_study(study_name='nn_design', storage=get_storage(SAVE_PATH))
 
     # Optimization complete
     pruned_trials = study.get_trials(deepcopy=False, states=[optuna.trial.TrialState.PRUNED])
     complete_trials = study.get_trials(deepcopy=False, states=[optuna.trial.TrialState.COMPLETE])
     best_trial = study.best_trial
+    trained, budget = pruning_savings(study)
 
     # Write log
     with open(f'{SAVE_PATH}/best_model_params.log', 'a') as f:
@@ -215,6 +349,11 @@ def optimize(input_data, output_data, n_trials, save_path):
         f.write(f'  Number of finished trials: {len(study.trials)}\n')
         f.write(f'  Number of pruned trials: {len(pruned_trials)}\n')
         f.write(f'  Number of complete trials: {len(complete_trials)}\n')
+        f.write(f'Pruning statistics:\n')
+        f.write(f'  Pruner: {PRUNER}\n')
+        f.write(f'  Epochs trained: {trained}\n')
+        f.write(f'  Epochs without pruning: {budget}\n')
+        f.write(f'  Epochs saved: {budget - trained} ({(1 - trained / max(budget, 1)) * 100:.1f}%)\n')
         f.write(f'Best trial:\n')
         f.write(f'  Number: {best_trial.number}\n')
         f.write(f'  Value: {best_trial.value}\n')
@@ -227,8 +366,10 @@ def optimize(input_data, output_data, n_trials, save_path):
     new_file_path = f'{SAVE_PATH}/best_model.pkl'
     shutil.copyfile(old_file_path, new_file_path)
     
-    # Save study object
-    joblib.dump(study, f'{SAVE_PATH}/study.pkl')
+    # Save a self-contained in-memory copy of the study object
+    study_copy = optuna.create_study(direction='minimize')
+    study_copy.add_trials(study.get_trials(deepcopy=False))
+    joblib.dump(study_copy, f'{SAVE_PATH}/study.pkl')
     
     # # Remove tested models
     # shutil.rmtree(f'{SAVE_PATH}/tested_models')
@@ -12,6 +12,7 @@ import torch
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import root_mean_squared_error, r2_score
+from torch.utils.data import TensorDataset, DataLoader
 from matplotlib.ticker import FormatStrFormatter
 from tqdm import tqdm
 
@@ -24,8 +25,17 @@ def get_std(data):
     data_std = scaler.fit_transform(data)
     return scaler, data_std
 
-def train(input_data, output_data, best_model_pkl, best_model_params, epochs, patience, save_path):
-    global INPUT_DATA, OUTPUT_DATA, BEST_MODEL_PKL, BEST_MODEL_PARAMS, EPOCHS, PATIENCE, SAVE_PATH, DEVICE
+def get_scheduler(optimizer, lr_scheduler):
+    if lr_scheduler == 'plateau':
+        # The plateau scheduler steps once per validation, so its patience is counted in validations
+        return torch.optim.lr_scheduler.ReduceLROnPlateau(optimizer, factor=0.5, patience=max(PATIENCE // (5 * VALID_INTERVAL), 1))
+    elif lr_scheduler == 'cosine':
+        return torch.optim.lr_scheduler.CosineAnnealingLR(optimizer, T_max=EPOCHS)
+    else:
+        return None
+
+def train(input_data, output_data, best_model_pkl, best_model_params, epochs, patience, save_path, valid_interval=1, batch_size=None, accumulation_steps=1, lr_scheduler='none'):
+    global INPUT_DATA, OUTPUT_DATA, BEST_MODEL_PKL, BEST_MODEL_PARAMS, EPOCHS, PATIENCE, SAVE_PATH, VALID_INTERVAL, BATCH_SIZE, ACCUMULATION_STEPS, DEVICE
     
     INPUT_DATA = input_data
     OUTPUT_DATA = output_data
@@ -34,6 +44,9 @@ def train(input_data, output_data, best_model_pkl, best_model_params, epochs, pa
     EPOCHS = epochs
     PATIENCE = patience
     SAVE_PATH = save_path
+    VALID_INTERVAL = valid_interval
+    BATCH_SIZE = batch_size
+    ACCUMULATION_STEPS = accumulation_steps
     DEVICE = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
 
     # Create save path directory
@@ -69,43 +82,88 @@ def train(input_data, output_data, best_model_pkl, best_model_params, epochs, pa
     # Retrain model
     model.train()
     optimizer = torch.optim.RMSprop(model.parameters(), lr=LR, weight_decay=WD)
+    scheduler = get_scheduler(optimizer, lr_scheduler)
     loss_func = torch.nn.MSELoss()
-    best_loss = np.inf
-    wait = 0
-    train_loss = []
-    valid_loss = []
+    # Early stopping state stays on the device, wait_bound is a host-side upper bound of wait
+    best_loss = torch.tensor(float('inf'), device=DEVICE)
+    wait = torch.zeros((), dtype=torch.long, device=DEVICE)
+    wait_bound = 0
     train_x, train_y = torch.FloatTensor(data_train[0]).to(DEVICE), torch.FloatTensor(data_train[1]).to(DEVICE)
     valid_x, valid_y = torch.FloatTensor(data_valid[0]).to(DEVICE), torch.FloatTensor(data_valid[1]).to(DEVICE)
+
+    # Mini-batch mode reads shuffled batches from pinned host memory, BATCH_SIZE = None keeps the full-batch path
+    if BATCH_SIZE is not None:
+        train_loader = DataLoader(
+            TensorDataset(torch.FloatTensor(data_train[0]), torch.FloatTensor(data_train[1])),
+            batch_size=BATCH_SIZE,
+            shuffle=True,
+            pin_memory=DEVICE.type == 'cuda',
+            generator=torch.Generator().manual_seed(42),
+        )
+
+    # Loss history stays on the device until training ends, NaN marks epochs without a value
+    train_loss = torch.full((EPOCHS,), float('nan'), device=DEVICE)
+    valid_loss = torch.full((EPOCHS,), float('nan'), device=DEVICE)
     for epoch in tqdm(range(EPOCHS), desc='Training'):
-        optimizer.zero_grad()
-        output_train = model(train_x)
-        output_valid = model(valid_x)
-        loss_train = loss_func(output_train, train_y)
-        loss_valid = loss_func(output_valid, valid_y)
-        loss_train.backward()
-        optimizer.step()
-        train_loss.append([epoch, loss_train.item()])
-        valid_loss.append([epoch, loss_valid.item()])
-
-        # Early stopping
-        if loss_valid.item() < best_loss:
-            best_loss = loss_valid.item()
-            wait = 0
+        if BATCH_SIZE is None:
+            optimizer.zero_grad()
+            output_train = model(train_x)
+            loss_train = loss_func(output_train, train_y)
+            loss_train.backward()
+            optimizer.step()
+            train_loss[epoch] = loss_train.detach()
         else:
-            wait += 1
-            if wait >= PATIENCE:
+            # Gradients of ACCUMULATION_STEPS batches are averaged before each optimizer step
+            # The last group of an epoch may hold fewer batches and is averaged over its own size
+            loss_sum = torch.zeros((), device=DEVICE)
+            optimizer.zero_grad()
+            for step, (batch_x, batch_y) in enumerate(train_loader):
+                batch_x, batch_y = batch_x.to(DEVICE, non_blocking=True), batch_y.to(DEVICE, non_blocking=True)
+                loss_batch = loss_func(model(batch_x), batch_y)
+                group_size = min(ACCUMULATION_STEPS, len(train_loader) - step // ACCUMULATION_STEPS * ACCUMULATION_STEPS)
+                (loss_batch / group_size).backward()
+                if (step + 1) % ACCUMULATION_STEPS == 0 or step + 1 == len(train_loader):
+                    optimizer.step()
+                    optimizer.zero_grad()
+                loss_sum += loss_batch.detach() * len(batch_x)
+            train_loss[epoch] = loss_sum / len(train_loader.dataset)
+        if lr_scheduler == 'cosine':
+            scheduler.step()
+
+        # Validate every VALID_INTERVAL epochs without autograd and without dropout
+        if (epoch + 1) % VALID_INTERVAL != 0:
+            continue
+        model.eval()
+        with torch.no_grad():
+            loss_valid = loss_func(model(valid_x), valid_y)
+        model.train()
+        valid_loss[epoch] = loss_valid
+        if lr_scheduler == 'plateau':
+            scheduler.step(loss_valid.item())
+
+        # Early stopping, patience is counted in epochs
+        # wait is only read back once it could have reached PATIENCE, not after every validation
+        improved = loss_valid < best_loss
+        best_loss = torch.minimum(best_loss, loss_valid)
+        wait = torch.where(improved, torch.zeros_like(wait), wait + VALID_INTERVAL)
+        wait_bound += VALID_INTERVAL
+        if wait_bound >= PATIENCE:
+            wait_bound = int(wait)
+            if wait_bound >= PATIENCE:
                 break
     
     # Plot training loss vs. epoch and validation loss vs. epoch
-    train_loss = np.array(train_loss)
-    valid_loss = np.array(valid_loss)
+    train_loss = train_loss[:epoch + 1].cpu().numpy()
+    valid_loss = valid_loss[:epoch + 1].cpu().numpy()
+    epochs_train = np.flatnonzero(~np.isnan(train_loss))
+    epochs_valid = np.flatnonzero(~np.isnan(valid_loss))
     sns.set_theme(font_scale=1.2, style='whitegrid')
     matplotlib.rcParams['xtick.direction'] = 'in'
     matplotlib.rcParams['ytick.direction'] = 'in'
     fig = plt.figure(figsize=(10, 4), constrained_layout=True)
     ax = plt.subplot()
-    ax.plot(train_loss[:, 0], train_loss[:, 1], label='Training', color='C0', linewidth=1.5)
-    ax.plot(valid_loss[:, 0], valid_loss[:, 1], label='Validation', color='C1', linewidth=1.5)
+    ax.plot(epochs_train, train_loss[epochs_train], label='Training', color='C0', linewidth=1.5)
+    ax.plot(epochs_valid, valid_loss[epochs_valid], label='Validation', color='C1', linewidth=1.5)
     ax.set_ylabel('Loss')
     ax.set_xlabel('Epoch')
     ax.legend(loc='upper right', frameon=True)
@@ -1,6 +1,6 @@
 # !/usr/bin/env python3
 
-import os, sys, datetime, time
+import os, sys, datetime, time, json, shutil
 import numpy as np
 from pathlib import Path
 from colorama import Fore, Style
@@ -116,9 +116,9 @@ def global_commands():
         'Exit  ->  Quit the Masgent',
     ]
 
-def write_comments(file, file_type, comments):
-    with open(file, 'r') as f:
-        lines = f.readlines()
+def render_comments(text, file_type, comments):
+    '''Put the Masgent comment into file text: it replaces the first line of a POSCAR or KPOINTS and is prepended to an INCAR.'''
+    lines = text.splitlines(keepends=True)
 
     if file_type.lower() in {'poscar', 'kpoints'}:
         lines[0] = comments + '\n'
@@ -126,8 +126,68 @@ def write_comments(file, file_type, comments):
     elif file_type.lower() in {'incar'}:
         lines.insert(0, f'{comments}\n')
     
-    with open(file, 'w') as f:
-        f.writelines(lines)
+    return ''.join(lines)
+
+def write_atomic(file, text):
+    '''Write text to a temporary file next to file and rename it into place.'''
+    tmp_file = f'{file}.tmp'
+    with open(tmp_file, 'w') as f:
+        f.write(text)
+    os.replace(tmp_file, file)
+
+def write_vasp_file(obj, file, file_type, comments, **kwargs):
+    '''
+    Render a pymatgen VASP input object (Incar, Poscar, Kpoints), ASE Atoms or already rendered text with
+    the Masgent comment in place and write it once. kwargs go to Poscar.get_str or to the ASE VASP writer.
+    '''
+    if isinstance(obj, str):
+        text = obj
+    elif hasattr(obj, 'get_chemical_symbols'):
+        from io import StringIO
+        from ase.io import write
+        buffer = StringIO()
+        write(buffer, obj, format='vasp', **kwargs)
+        text = buffer.getvalue()
+    else:
+        text = obj.get_str(**kwargs) if kwargs else str(obj)
+    write_atomic(file, render_comments(text, file_type, comments))
+
+def link_or_copy(src, dst):
+    '''Hard-link src to dst, falling back to a copy where hard links are not supported.'''
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+class VaspInputCache:
+    '''
+    Workflow-level cache for pymatgen input sets whose sub-directories only differ in geometry or KPOINTS.
+    The INCAR is built once per input set, species and user settings, the POTCAR is written once per
+    functional and symbols and hard-linked into the other sub-directories.
+    '''
+    def __init__(self):
+        self.incars = {}
+        self.potcars = {}
+
+    def write_incar(self, vis, path, comments):
+        key = (
+            type(vis).__name__,
+            tuple(str(sp) for sp in vis.structure.species),
+            json.dumps(vis.user_incar_settings or {}, sort_keys=True, default=str),
+        )
+        if key not in self.incars:
+            self.incars[key] = vis.incar
+        write_vasp_file(self.incars[key], path, 'incar', comments)
+
+    def write_potcar(self, vis, path):
+        key = (vis.potcar_functional, tuple(vis.potcar_symbols))
+        if key in self.potcars and os.path.isfile(self.potcars[key]):
+            link_or_copy(self.potcars[key], path)
+        else:
+            vis.potcar.write_file(path)
+            self.potcars[key] = path
 
 def generate_batch_script():
     '''
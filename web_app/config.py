@@ -27,12 +27,15 @@ from masgent.tools import (
     generate_sqs_from_poscar,
     generate_surface_slab_from_poscar,
     generate_interface_from_poscars,
+    screen_interfaces_from_poscars,
     generate_vasp_workflow_of_convergence_tests,
     generate_vasp_workflow_of_eos,
     generate_vasp_workflow_of_elastic_constants,
     generate_vasp_workflow_of_aimd,
     generate_vasp_workflow_of_neb,
     run_simulation_using_mlps,
+    run_batch_screening_using_mlps,
+    run_md_temperature_sweep_using_mlps,
     analyze_features_for_machine_learning,
     reduce_dimensions_for_machine_learning,
     augment_data_for_machine_learning,
@@ -55,12 +58,15 @@ from masgent.schemas import (
     GenerateSqsFromPoscar,
     GenerateSurfaceSlabFromPoscar,
     GenerateInterfaceFromPoscars,
+    ScreenInterfacesFromPoscars,
     GenerateVaspWorkflowOfConvergenceTests,
     GenerateVaspWorkflowOfEos,
     GenerateVaspWorkflowOfElasticConstants,
     GenerateVaspWorkflowOfAimd,
     GenerateVaspWorkflowOfNeb,
     RunSimulationUsingMlps,
+    RunBatchScreeningUsingMlps,
+    RunMdTemperatureSweepUsingMlps,
     AnalyzeFeaturesForMachineLearning,
     ReduceDimensionsForMachineLearning,
     AugmentDataForMachineLearning,
@@ -113,6 +119,12 @@ TOOL_REGISTRY = {
             "desc": "Generate interface structure from two POSCAR files.",
             "icon": "🔗"
         },
+        "Screen Interfaces": {
+            "func": screen_interfaces_from_poscars,
+            "schema": ScreenInterfacesFromPoscars,
+            "desc": "Rank lattice matches over many Miller index pairs.",
+            "icon": "🔎"
+        },
         "Generate SQS": {
             "func": generate_sqs_from_poscar,
             "schema": GenerateSqsFromPoscar,
@@ -199,6 +211,18 @@ TOOL_REGISTRY = {
             "desc": "Fast simulations using ML potentials (CHGNet, SevenNet, Orb-v3, MatSim).",
             "icon": "🚀"
         },
+        "Batch Screening": {
+            "func": run_batch_screening_using_mlps,
+            "schema": RunBatchScreeningUsingMlps,
+            "desc": "Screen many structures at once with ML potentials.",
+            "icon": "🗂️"
+        },
+        "MD Temperature Sweep": {
+            "func": run_md_temperature_sweep_using_mlps,
+            "schema": RunMdTemperatureSweepUsingMlps,
+            "desc": "Parallel NVT replicas at several temperatures with ML potentials.",
+            "icon": "🌡️"
+        },
     },
     "🤖 Machine Learning": {
         "Feature Analysis": {